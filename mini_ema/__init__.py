@@ -4,9 +4,26 @@ A modular chatbot framework with pluggable bot implementations
 and a Gradio-based chat interface.
 """
 
-from .bot import BaseBot, SimpleBot
-from .ui import ChatUI
-
-
 __version__ = "0.1.0"
 __all__ = ["BaseBot", "ChatUI", "SimpleBot"]
+
+
+def __getattr__(name: str):
+    """Lazily import public classes on first access (PEP 562).
+
+    This keeps ``import mini_ema`` cheap, since the UI module pulls in Gradio.
+    """
+    if name in ("BaseBot", "SimpleBot"):
+        from . import bot
+
+        return getattr(bot, name)
+    if name == "ChatUI":
+        from .ui import ChatUI
+
+        return ChatUI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    """List module attributes including lazily imported ones."""
+    return sorted(list(globals()) + __all__)
@@ -7,21 +7,21 @@ from .bot import BareGeminiBot, PrettyGeminiBot, SimpleBot
 from .ui import ChatUI
 
 
-# Load environment variables from .env file
-load_dotenv()
-
-
 def main():
     """Main entry point for Mini Ema chat application."""
-    # Create bot instances
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Create bots - Gemini bots are passed as factories and created when first selected
     bots = {
         "Simple Bot": SimpleBot(),
-        "Bare Gemini Bot": BareGeminiBot(),
-        "Pretty Gemini Bot": PrettyGeminiBot(),
+        "Bare Gemini Bot": BareGeminiBot,
+        "Pretty Gemini Bot": PrettyGeminiBot,
     }
 
-    # Create and launch the chat UI
-    chat_ui = ChatUI(bots)
+    # Create and launch the chat UI, warming up the Gemini connection on the app's event loop
+    # on the first page load, so the first message does not pay for it
+    chat_ui = ChatUI(bots, on_load=BareGeminiBot.warm_up)
     chat_ui.launch(theme=gr.themes.Default())
 
 
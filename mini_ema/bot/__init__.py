@@ -6,8 +6,10 @@ It includes base classes and implementations for different bot strategies.
 
 from .bare_gemini_bot import BareGeminiBot
 from .base import BaseBot
+from .llm_cache import LLMCache
 from .pretty_gemini_bot import PrettyGeminiBot
+from .semantic_cache import SemanticCache
 from .simple_bot import SimpleBot
 
 
-__all__ = ["BareGeminiBot", "BaseBot", "PrettyGeminiBot", "SimpleBot"]
+__all__ = ["BareGeminiBot", "BaseBot", "LLMCache", "PrettyGeminiBot", "SemanticCache", "SimpleBot"]
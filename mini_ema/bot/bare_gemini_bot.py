@@ -1,13 +1,242 @@
 """Gemini LLM bot implementation."""
 
+import asyncio
+import gzip
+import importlib.util
 import os
-from collections.abc import Iterable
+import ssl
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
 
+import certifi
+import httpx
 from google import genai
 from google.genai import types
 from google.genai.errors import APIError
 
 from .base import BaseBot
+from .llm_cache import LLMCache, make_cache_key
+from .semantic_cache import SemanticCache
+
+
+# Thinking levels accepted in configuration, resolved once at import
+_THINKING_LEVELS = {name: getattr(types.ThinkingLevel, name) for name in ("MINIMAL", "LOW", "MEDIUM", "HIGH")}
+
+
+def _thinking_config(thinking_level: types.ThinkingLevel, thinking_budget: int | None) -> types.ThinkingConfig:
+    """Build the thinking config for a bot.
+
+    Args:
+        thinking_level: Thinking level used by models that support levels (Gemini 3)
+        thinking_budget: Token budget for models that take one instead (Gemini 2.5), where
+            0 turns thinking off. If None, the thinking level is used.
+
+    Returns:
+        The thinking config
+    """
+    if thinking_budget is not None:
+        return types.ThinkingConfig(thinking_budget=thinking_budget)
+    return types.ThinkingConfig(thinking_level=thinking_level)
+
+
+# Display names for finish reasons shown in the usage log, e.g. "STOP" -> "Stop"
+_FINISH_REASONS = {reason.value: reason.value.capitalize() for reason in types.FinishReason}
+
+# Batch job states after which the job will not change anymore
+_BATCH_DONE_STATES = {
+    types.JobState.JOB_STATE_SUCCEEDED,
+    types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED,
+    types.JobState.JOB_STATE_FAILED,
+    types.JobState.JOB_STATE_CANCELLED,
+    types.JobState.JOB_STATE_EXPIRED,
+}
+
+# Gemini clients shared by all bots, keyed by API key, so they reuse one connection pool
+_CLIENTS: dict[str, genai.Client] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+# Request bodies smaller than this are sent uncompressed, as gzip would barely shrink them
+_GZIP_MIN_BYTES = 1024
+
+
+def _gzip_request(request: httpx.Request) -> httpx.Request:
+    """Gzip the body of a request that is large enough to benefit from it.
+
+    Args:
+        request: The request about to be sent
+
+    Returns:
+        A copy of the request with a gzipped body, or the request itself if it is
+        small, streamed, or already encoded
+    """
+    if "Content-Encoding" in request.headers or not isinstance(request.stream, httpx.ByteStream):
+        return request
+    body = request.read()
+    if len(body) < _GZIP_MIN_BYTES:
+        return request
+
+    # Fastest compression level: the history and instructions are repetitive enough to shrink well
+    headers = request.headers.copy()
+    del headers["Content-Length"]
+    headers["Content-Encoding"] = "gzip"
+    return httpx.Request(
+        request.method,
+        request.url,
+        headers=headers,
+        content=gzip.compress(body, compresslevel=1),
+        extensions=request.extensions,
+    )
+
+
+class _GzipTransport(httpx.HTTPTransport):
+    """HTTP transport that gzips large request bodies before sending them."""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return super().handle_request(_gzip_request(request))
+
+
+class _AsyncGzipTransport(httpx.AsyncHTTPTransport):
+    """Async HTTP transport that gzips large request bodies before sending them."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await super().handle_async_request(_gzip_request(request))
+
+
+def _http_options() -> types.HttpOptions:
+    """Build the HTTP options for Gemini requests.
+
+    Reads GEMINI_REQUEST_TIMEOUT (seconds, optional) and GEMINI_REQUEST_RETRIES
+    (default 2). The timeout caps the total generation time of a request, not just
+    the connection, so it is unset by default. Timed out, rate limited, and server
+    error requests are retried by the SDK with exponential backoff.
+
+    When GEMINI_REQUEST_COMPRESSION is set to 1, large request bodies (the whole
+    history is sent with every message) are gzipped. When GEMINI_HTTP2 is set to 1,
+    requests are multiplexed over HTTP/2 connections, which requires the h2 package
+    (pip install httpx[http2]). Either option replaces the SDK's default transports,
+    so they are built with the same SSL context the SDK would use.
+
+    Returns:
+        HTTP options with the request timeout, retry policy, and transports
+    """
+    timeout = os.getenv("GEMINI_REQUEST_TIMEOUT")
+    retries = max(0, int(os.getenv("GEMINI_REQUEST_RETRIES", "2")))
+    options = types.HttpOptions(
+        timeout=int(float(timeout) * 1000) if timeout else None,
+        retry_options=types.HttpRetryOptions(attempts=retries + 1, initial_delay=0.5, max_delay=4.0),
+    )
+    http2 = os.getenv("GEMINI_HTTP2") == "1"
+    if http2 and importlib.util.find_spec("h2") is None:
+        # httpx only needs h2 once a server negotiates HTTP/2, so fail early instead of on the first request
+        raise ImportError("GEMINI_HTTP2=1 requires the h2 package. Install it with: pip install httpx[http2]")
+    compression = os.getenv("GEMINI_REQUEST_COMPRESSION") == "1"
+    if not compression and not http2:
+        return options
+
+    # Custom transports ignore the client's verify setting, so give them the SDK's SSL context,
+    # which honors SSL_CERT_FILE and SSL_CERT_DIR
+    verify = ssl.create_default_context(
+        cafile=os.environ.get("SSL_CERT_FILE", certifi.where()), capath=os.environ.get("SSL_CERT_DIR")
+    )
+    if compression:
+        transport_class, async_transport_class = _GzipTransport, _AsyncGzipTransport
+    else:
+        transport_class, async_transport_class = httpx.HTTPTransport, httpx.AsyncHTTPTransport
+    options.client_args = {"transport": transport_class(verify=verify, http2=http2), "verify": verify}
+    options.async_client_args = {"transport": async_transport_class(verify=verify, http2=http2), "verify": verify}
+    return options
+
+
+def _get_client(api_key: str) -> genai.Client:
+    """Get the shared Gemini client for an API key, creating it on first use.
+
+    Args:
+        api_key: Gemini API key
+
+    Returns:
+        The Gemini client for the API key
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            client = _CLIENTS[api_key] = genai.Client(api_key=api_key, http_options=_http_options())
+        return client
+
+
+class _StreamBuffer:
+    """Accumulates streamed text and decides when a partial message should be emitted.
+
+    The first chunk is emitted right away. After that, chunks are coalesced until
+    enough characters or time have accumulated, so consumers are not flooded with
+    one tiny update per streamed chunk.
+    """
+
+    def __init__(self, flush_chars: int, flush_interval: float):
+        """Initialize the stream buffer.
+
+        Args:
+            flush_chars: Number of new characters that triggers a flush
+            flush_interval: Seconds since the last flush that trigger a flush
+        """
+        self.flush_chars = flush_chars
+        self.flush_interval = flush_interval
+        self._parts: list[str] = []
+        self._pending = 0
+        self._last_flush: float | None = None
+
+    def add(self, text: str) -> bool:
+        """Add streamed text to the buffer.
+
+        Args:
+            text: The text of a streamed chunk
+
+        Returns:
+            True if a partial message with the text so far should be emitted
+        """
+        self._parts.append(text)
+        self._pending += len(text)
+        now = time.monotonic()
+        if (
+            self._last_flush is None
+            or self._pending >= self.flush_chars
+            or now - self._last_flush >= self.flush_interval
+        ):
+            self._pending = 0
+            self._last_flush = now
+            return True
+        return False
+
+    @property
+    def text(self) -> str:
+        """The complete text received so far."""
+        return "".join(self._parts)
+
+
+class _Turn:
+    """State of a single exchange, shared by the sync and async response paths."""
+
+    def __init__(self, message: str, prompt: str, buffer: _StreamBuffer):
+        """Initialize the turn.
+
+        Args:
+            message: The user's message, as embedded for the semantic cache
+            prompt: The text sent to the model and recorded in the history
+            buffer: Buffer accumulating the streamed response text
+        """
+        self.message = message
+        self.prompt = prompt
+        self.buffer = buffer
+        # Request contents, for bots that send the history themselves instead of using a chat session
+        self.contents: list[types.Content] | None = None
+        self.cache_key: str | None = None
+        self.embedding: list[float] | None = None
+        # Message answering the turn from a cache, if any
+        self.cached: dict | None = None
+        # Last streamed chunk, and the one carrying the finish reason
+        self.response: types.GenerateContentResponse | None = None
+        self.finished: types.GenerateContentResponse | None = None
 
 
 class BareGeminiBot(BaseBot):
@@ -15,9 +244,22 @@ class BareGeminiBot(BaseBot):
 
     This bot integrates with the official Google GenAI SDK to provide
     AI-powered responses using the Gemini 3 Flash model with conversation history.
+
+    The optional system instruction is fixed for the lifetime of the bot and turns are
+    only ever appended to the chat history, so every request starts with the same
+    prefix and Gemini's implicit prompt cache can be reused from the second turn on.
     """
 
-    def __init__(self, api_key: str | None = None, model: str | None = None, thinking_level: str | None = None):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        model: str | None = None,
+        thinking_level: str | None = None,
+        semantic_cache: SemanticCache | None = None,
+        response_cache: LLMCache | None = None,
+        system_instruction: str | None = None,
+        thinking_budget: int | None = None,
+    ):
         """Initialize the Gemini bot.
 
         Args:
@@ -25,6 +267,16 @@ class BareGeminiBot(BaseBot):
             model: Model name to use. If None, reads from GEMINI_MODEL env var or uses default.
             thinking_level: Thinking level (MINIMAL, LOW, MEDIUM, HIGH). If None, reads from
                 BARE_GEMINI_BOT_THINKING_LEVEL env var or uses MINIMAL as default.
+            semantic_cache: Cache used to answer near-duplicate messages without calling the model.
+                If None, one is created when BARE_GEMINI_BOT_SEMANTIC_CACHE_THRESHOLD env var is set.
+            response_cache: Cache used to answer exactly repeated requests (same model, history,
+                and message) without calling the model. Checked before the semantic cache.
+                If None, one is created when BARE_GEMINI_BOT_RESPONSE_CACHE env var is set to 1.
+            system_instruction: System instruction pinned at the start of every request. If None,
+                reads from BARE_GEMINI_BOT_SYSTEM_INSTRUCTION env var (optional).
+            thinking_budget: Thinking token budget replacing the thinking level, for models that
+                use budgets (0 disables thinking). If None, reads from BARE_GEMINI_BOT_THINKING_BUDGET
+                env var (optional).
         """
         # Get API key from parameter or environment variable
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
@@ -38,29 +290,75 @@ class BareGeminiBot(BaseBot):
 
         # Get thinking level from parameter or environment variable
         thinking_level_str = thinking_level or os.getenv("BARE_GEMINI_BOT_THINKING_LEVEL", "MINIMAL")
-        self.thinking_level = getattr(types.ThinkingLevel, thinking_level_str.upper(), types.ThinkingLevel.MINIMAL)
+        self.thinking_level = _THINKING_LEVELS.get(thinking_level_str.upper(), types.ThinkingLevel.MINIMAL)
+        thinking_budget_str = os.getenv("BARE_GEMINI_BOT_THINKING_BUDGET")
+        if thinking_budget is None and thinking_budget_str:
+            thinking_budget = int(thinking_budget_str)
+        self.thinking_budget = thinking_budget
 
-        # Initialize the Gemini client
-        self.client = genai.Client(api_key=self.api_key)
+        # Get the optional system instruction, which stays the same for every request
+        self.system_instruction = system_instruction or os.getenv("BARE_GEMINI_BOT_SYSTEM_INSTRUCTION")
+
+        # Build the chat config once and reuse it for every chat session
+        self._chat_config = types.GenerateContentConfig(
+            system_instruction=self.system_instruction,
+            thinking_config=_thinking_config(self.thinking_level, self.thinking_budget),
+        )
+
+        # Get the Gemini client shared by all bots using this API key
+        self.client = _get_client(self.api_key)
 
         # Initialize chat session with thinking config
         self.chat = self.client.chats.create(
             model=self.model,
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_level=self.thinking_level)
-            ),
+            config=self._chat_config,
         )
 
+        # Coalesce streamed chunks into partial messages by size or time
+        self.stream_flush_chars = int(os.getenv("BARE_GEMINI_BOT_STREAM_FLUSH_CHARS", "64"))
+        self.stream_flush_interval = int(os.getenv("BARE_GEMINI_BOT_STREAM_FLUSH_MS", "50")) / 1000
+
+        # Optional semantic response cache (disabled unless configured)
+        threshold_str = os.getenv("BARE_GEMINI_BOT_SEMANTIC_CACHE_THRESHOLD")
+        if semantic_cache is None and threshold_str:
+            semantic_cache = SemanticCache(threshold=float(threshold_str))
+        self.semantic_cache = semantic_cache
+        self.embedding_model = os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-001")
+
+        # Optional exact-match response cache (disabled unless configured)
+        if response_cache is None and os.getenv("BARE_GEMINI_BOT_RESPONSE_CACHE") == "1":
+            ttl_str = os.getenv("BARE_GEMINI_BOT_RESPONSE_CACHE_TTL")
+            response_cache = LLMCache(ttl=float(ttl_str) if ttl_str else None)
+        self.response_cache = response_cache
+
+    @staticmethod
+    async def warm_up(api_key: str | None = None) -> None:
+        """Open the shared client's async connection before the first request.
+
+        Sends a cheap model listing request so DNS, TLS, and HTTP setup are not paid on
+        the first user message. It goes through the async client used by aget_response,
+        so it must be awaited on the event loop that serves the chat. Failures are ignored,
+        since the real request will report them.
+
+        Args:
+            api_key: Gemini API key. If None, reads from GEMINI_API_KEY env var.
+        """
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return
+        try:
+            await _get_client(api_key).aio.models.list(config={"page_size": 1})
+        except Exception:
+            pass
+
     def clear(self):
         """Clear conversation history by creating a new chat session."""
         self.chat = self.client.chats.create(
             model=self.model,
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_level=self.thinking_level)
-            ),
+            config=self._chat_config,
         )
 
-    def get_response(self, message: str, username: str = "Phoenix") -> Iterable[dict]:
+    def get_response(self, message: str, username: str = "Phoenix") -> Iterator[dict]:
         """Generate a response using Gemini API with conversation history.
 
         Args:
@@ -71,49 +369,406 @@ class BareGeminiBot(BaseBot):
             Message dictionaries with role, content, and metadata.
             Each dictionary has:
                 - role: "assistant"
-                - content: The message text
-                - metadata: Dict with title and log (plain text formatted usage info)
+                - content: The message text generated so far
+                - metadata: Dict with title and log (plain text formatted usage info, including prompt
+                  tokens served from Gemini's context cache, final message only)
+                - pending: True while streaming, omitted from the final message
         """
         try:
-            # Send message to chat and get response (username parameter is ignored)
-            response = self.chat.send_message(message)
+            # Answer repeated requests from the exact-match response cache if enabled
+            turn = self._start_turn(message, username)
 
-            # Extract response data using direct API access
-            finish_reason = response.candidates[0].finish_reason.value.capitalize()
-            text = response.text
-            model_version = response.model_version
+            # Answer near-duplicate messages from the semantic cache if enabled
+            if turn.cached is None and self.semantic_cache is not None:
+                result = self.client.models.embed_content(model=self.embedding_model, contents=message)
+                self._check_semantic_cache(turn, result.embeddings[0].values)
+            if turn.cached is not None:
+                yield turn.cached
+                return
 
-            # Format usage metadata as plain text
-            log_text = self._format_usage_log(finish_reason, response.usage_metadata, model_version)
+            for response in self._stream(turn):
+                if (partial := self._stream_step(turn, response)) is not None:
+                    yield partial
+            yield self._finish_turn(turn)
+        except Exception as e:
+            yield self._format_error(e)
 
-            # Yield the response with metadata
-            yield {
-                "role": "assistant",
-                "content": text,
-                "metadata": {
-                    "title": "💡 Answer",
-                    "log": log_text,
-                },
-            }
+    async def aget_response(self, message: str, username: str = "Phoenix") -> AsyncIterator[dict]:
+        """Asynchronously generate a response using the async Gemini client.
+
+        Works like get_response, with the embedding and generation requests sent through
+        the client's aio interface.
+
+        Args:
+            message: The user's message
+            username: The name of the user (unused, parameter ignored)
+
+        Yields:
+            Message dictionaries with the same structure as get_response.
+        """
+        try:
+            # Answer repeated requests from the exact-match response cache if enabled
+            turn = self._start_turn(message, username)
+
+            # Answer near-duplicate messages from the semantic cache if enabled
+            if turn.cached is None and self.semantic_cache is not None:
+                result = await self.client.aio.models.embed_content(model=self.embedding_model, contents=message)
+                self._check_semantic_cache(turn, result.embeddings[0].values)
+            if turn.cached is not None:
+                yield turn.cached
+                return
+
+            async for response in self._astream(turn):
+                if (partial := self._stream_step(turn, response)) is not None:
+                    yield partial
+            yield self._finish_turn(turn)
+        except Exception as e:
+            yield self._format_error(e)
+
+    def get_responses_batch(
+        self, messages: list[str], username: str = "Phoenix", poll_interval: float = 10.0
+    ) -> list[dict]:
+        """Generate responses for many independent messages with Gemini's batch mode.
+
+        Batch requests cost less than interactive ones but may take minutes or longer
+        to complete, so this is meant for non-interactive bulk use such as evaluations.
+        Each message is answered on its own, without the conversation history, and the
+        chat session is left unchanged.
+
+        Args:
+            messages: The user messages to answer
+            username: The name of the user
+            poll_interval: Seconds to wait between checks of the batch job state
+
+        Returns:
+            One final message dictionary per input message, in the same order, with the
+            same structure as the last message yielded by get_response.
+        """
+        try:
+            requests = []
+            for message in messages:
+                contents, config = self._one_shot_request(message, username)
+                requests.append(types.InlinedRequest(contents=contents, config=config))
+            job = self.client.batches.create(model=self.model, src=requests)
+            while job.state not in _BATCH_DONE_STATES:
+                time.sleep(poll_interval)
+                job = self.client.batches.get(name=job.name)
+
+            if job.state not in (types.JobState.JOB_STATE_SUCCEEDED, types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED):
+                raise RuntimeError(f"Batch job {job.name} ended with state {job.state.name}")
+
+            # Format each response on its own, so one failed or blocked item does not discard the others
+            results = []
+            for inlined in job.dest.inlined_responses:
+                try:
+                    if inlined.error:
+                        raise APIError(inlined.error.code, {"error": {"message": inlined.error.message}})
+                    results.append(self._format_response(inlined.response, inlined.response.text or ""))
+                except Exception as e:
+                    results.append(self._format_error(e))
+            return results
+        except Exception as e:
+            return [self._format_error(e) for _ in messages]
+
+    async def aget_responses(self, messages: list[str], username: str = "Phoenix") -> list[dict]:
+        """Generate responses for many independent messages concurrently.
+
+        All requests are sent at once through the async client, so the total wait is
+        about that of the slowest request instead of the sum of all of them. Each message
+        is answered on its own, without the conversation history, and the chat session
+        is left unchanged.
+
+        Args:
+            messages: The user messages to answer
+            username: The name of the user
+
+        Returns:
+            One final message dictionary per input message, in the same order, with the
+            same structure as the last message yielded by get_response.
+        """
+
+        async def respond(message: str) -> dict:
+            try:
+                contents, config = self._one_shot_request(message, username)
+                response = await self.client.aio.models.generate_content(
+                    model=self.model, contents=contents, config=config
+                )
+                return self._format_response(response, response.text or "")
+            except Exception as e:
+                return self._format_error(e)
+
+        return list(await asyncio.gather(*(respond(message) for message in messages)))
+
+    def _one_shot_request(self, message: str, username: str) -> tuple[str, types.GenerateContentConfig]:
+        """Build the contents and config for answering a message without conversation history.
+
+        Args:
+            message: The user's message
+            username: The name of the user (unused, parameter ignored)
+
+        Returns:
+            Tuple of (contents, config) for a generate_content request
+        """
+        return message, self._chat_config
+
+    def _start_turn(self, message: str, username: str) -> _Turn:
+        """Start a turn, answering it from the exact-match response cache on a hit.
+
+        Args:
+            message: The user's message
+            username: The name of the user (unused, parameter ignored)
+
+        Returns:
+            The turn, with its cached message set on a cache hit
+        """
+        turn = _Turn(message, message, _StreamBuffer(self.stream_flush_chars, self.stream_flush_interval))
+        if self.response_cache is not None:
+            turn.cache_key = self._cache_key(message)
+            cached = self.response_cache.get(turn.cache_key)
+            if cached is not None:
+                turn.cached = self._replay_cached(turn.prompt, cached, "Response cache hit")
+        return turn
+
+    def _check_semantic_cache(self, turn: _Turn, embedding: list[float]):
+        """Look up a turn in the semantic cache, replaying the cached answer on a hit.
+
+        Args:
+            turn: The turn being answered
+            embedding: Embedding of the user's message, kept to store the answer under on a miss
+        """
+        turn.embedding = embedding
+        cached = self.semantic_cache.get(embedding)
+        if cached is not None:
+            cached_value, similarity = cached
+            turn.cached = self._replay_cached(
+                turn.prompt, cached_value, f"Semantic cache hit | Similarity: {similarity:.2f}"
+            )
+
+    def _stream(self, turn: _Turn) -> Iterator[types.GenerateContentResponse]:
+        """Send a turn through the chat session, streaming the response chunks.
+
+        Args:
+            turn: The turn being answered
+
+        Returns:
+            Iterator over the streamed response chunks
+        """
+        return self.chat.send_message_stream(turn.prompt)
+
+    async def _astream(self, turn: _Turn) -> AsyncIterator[types.GenerateContentResponse]:
+        """Send a turn through the async client, streaming the response chunks.
+
+        The request is sent on a session seeded with the current chat history, and the
+        completed turn is recorded back into the chat so both the sync and async paths
+        share one conversation.
+
+        Args:
+            turn: The turn being answered
+
+        Yields:
+            The streamed response chunks
+        """
+        history = self.chat.get_history(curated=True)
+        chat = self.client.aio.chats.create(model=self.model, config=self._chat_config, history=history)
+        async for response in await chat.send_message_stream(turn.prompt):
+            yield response
+        self._record_turn(chat, len(history))
+
+    def _stream_step(self, turn: _Turn, response: types.GenerateContentResponse) -> dict | None:
+        """Add a streamed response chunk to a turn.
+
+        Args:
+            turn: The turn being answered
+            response: The streamed response chunk
+
+        Returns:
+            Partial message dictionary to emit, or None if the chunk is buffered
+        """
+        turn.response = response
+        # Keep the chunk that carries the finish reason, in case trailing chunks follow it
+        if response.candidates and response.candidates[0].finish_reason:
+            turn.finished = response
+        if response.text and turn.buffer.add(response.text) and (content := self._partial_content(turn.buffer.text)):
+            return self._format_partial(content)
+        return None
+
+    def _partial_content(self, text: str) -> str:
+        """Get the content shown for a partially streamed response.
+
+        Args:
+            text: The response text received so far
+
+        Returns:
+            The content to show, or an empty string if there is nothing to show yet
+        """
+        return text
+
+    def _finish_turn(self, turn: _Turn) -> dict:
+        """Build the final message of a streamed turn and store it in the enabled caches.
+
+        Args:
+            turn: The turn being answered, after its response has been streamed
+
+        Returns:
+            The final message dictionary
+        """
+        final_message = self._format_response(turn.finished or turn.response, turn.buffer.text)
+        self._store_cached(turn.cache_key, turn.embedding, final_message)
+        return final_message
+
+    def _record_turn(self, chat, history_length: int):
+        """Record the latest turn of a temporary chat session into the main chat.
+
+        Args:
+            chat: The temporary chat session the turn was sent on
+            history_length: Length of the curated history the session was created with
+        """
+        new_contents = chat.get_history(curated=True)[history_length:]
+        if new_contents:
+            self.chat.record_history(user_input=new_contents[0], model_output=new_contents[1:], is_valid=True)
+
+    def _cache_key(self, message: str) -> str:
+        """Build the exact-match cache key for a message in the current conversation.
 
-        except APIError as e:
+        Args:
+            message: The user's message
+
+        Returns:
+            Cache key covering the model, thinking settings, system instruction, chat history, and message
+        """
+        history = [
+            content.model_dump(mode="json", exclude_none=True) for content in self.chat.get_history(curated=True)
+        ]
+        return make_cache_key(
+            model=self.model,
+            thinking_level=self.thinking_level,
+            thinking_budget=self.thinking_budget,
+            system_instruction=self.system_instruction,
+            history=history,
+            message=message,
+        )
+
+    def _store_cached(self, cache_key: str | None, embedding: list[float] | None, value: Any):
+        """Store an answer in the enabled response caches.
+
+        Args:
+            cache_key: Exact-match cache key, or None if the response cache is disabled
+            embedding: Message embedding, or None if the semantic cache is disabled
+            value: The answer to cache, as later passed to _replay_cached (the final message dictionary)
+        """
+        if cache_key is not None:
+            self.response_cache.set(cache_key, value)
+        if embedding is not None:
+            self.semantic_cache.add(embedding, value)
+
+    def _replay_cached(self, message: str, cached_message: dict, log_text: str) -> dict:
+        """Record a cached answer as the latest chat turn and build its message dictionary.
+
+        Args:
+            message: The user's message
+            cached_message: The cached final message dictionary
+            log_text: Log text describing the cache hit
+
+        Returns:
+            Message dictionary with the cached content and a cache-hit log
+        """
+        # Keep the chat history consistent so later turns still see this exchange
+        self.chat.record_history(
+            user_input=types.UserContent(parts=[types.Part.from_text(text=message)]),
+            model_output=[types.ModelContent(parts=[types.Part.from_text(text=cached_message["content"])])],
+            is_valid=True,
+        )
+        return {
+            "role": "assistant",
+            "content": cached_message["content"],
+            "metadata": {
+                **cached_message["metadata"],
+                "log": log_text,
+            },
+        }
+
+    def _format_partial(self, text: str) -> dict:
+        """Build the assistant message dictionary for a partially streamed response.
+
+        Args:
+            text: The response text received so far
+
+        Returns:
+            Message dictionary marked as pending
+        """
+        return {
+            "role": "assistant",
+            "content": text,
+            "metadata": {
+                "title": "💡 Answer",
+            },
+            "pending": True,
+        }
+
+    def _format_response(self, response: types.GenerateContentResponse, text: str) -> dict:
+        """Build the final assistant message dictionary for a Gemini response.
+
+        Args:
+            response: The response chunk that finished the stream
+            text: The complete response text
+
+        Returns:
+            Message dictionary with role, content, and metadata
+        """
+        # Extract response data using direct API access
+        finish_reason = self._finish_reason_text(response)
+        model_version = response.model_version
+
+        # Format usage metadata as plain text
+        log_text = self._format_usage_log(finish_reason, response.usage_metadata, model_version)
+
+        return {
+            "role": "assistant",
+            "content": text,
+            "metadata": {
+                "title": "💡 Answer",
+                "log": log_text,
+            },
+        }
+
+    def _format_error(self, error: Exception) -> dict:
+        """Build the assistant message dictionary for an error.
+
+        Args:
+            error: The exception raised while generating a response
+
+        Returns:
+            Message dictionary describing the error
+        """
+        if isinstance(error, APIError):
             # Handle API errors
-            yield {
+            return {
                 "role": "assistant",
-                "content": f"API Error: {str(e)}",
+                "content": f"API Error: {str(error)}",
                 "metadata": {
                     "title": "❌ API Error",
                 },
             }
-        except Exception as e:
-            # Handle other errors
-            yield {
-                "role": "assistant",
-                "content": f"Unexpected error: {str(e)}",
-                "metadata": {
-                    "title": "❌ Error",
-                },
-            }
+        # Handle other errors
+        return {
+            "role": "assistant",
+            "content": f"Unexpected error: {str(error)}",
+            "metadata": {
+                "title": "❌ Error",
+            },
+        }
+
+    def _finish_reason_text(self, response: types.GenerateContentResponse) -> str:
+        """Get the display name of the reason the model stopped generating.
+
+        Args:
+            response: The response chunk that finished the stream
+
+        Returns:
+            Finish reason in capitalized form, e.g. "Stop"
+        """
+        value = response.candidates[0].finish_reason.value
+        return _FINISH_REASONS.get(value) or value.capitalize()
 
     def _format_usage_log(
         self, finish_reason: str, usage_metadata: types.GenerateContentResponseUsageMetadata, model_version: str
@@ -128,23 +783,19 @@ class BareGeminiBot(BaseBot):
         Returns:
             Plain text string with usage information in compact format
         """
-        parts = []
-        # Add model version (shortened)
-        parts.append(f"Model: {model_version}")
-
-        # Add finish reason (shortened)
-        parts.append(f"Finish: {finish_reason}")
-
-        # Add token usage if available (using short labels)
-        if usage_metadata:
-            token_parts = []
-            token_parts.append(f"Prompt: {usage_metadata.prompt_token_count}")
-            token_parts.append(f"Response: {usage_metadata.candidates_token_count}")
+        # Model version and finish reason (shortened)
+        log_text = f"Model: {model_version} | Finish: {finish_reason}"
+        if not usage_metadata:
+            return log_text
 
-            if usage_metadata.thoughts_token_count:
-                token_parts.append(f"Thoughts: {usage_metadata.thoughts_token_count}")
-
-            token_parts.append(f"Total: {usage_metadata.total_token_count}")
-            parts.append(" | ".join(token_parts))
-
-        return " | ".join(parts)
+        # Token usage (using short labels), with thoughts only when the model used any
+        thoughts = usage_metadata.thoughts_token_count
+        thoughts_text = f" | Thoughts: {thoughts}" if thoughts else ""
+        # Prompt tokens served from Gemini's context cache, shown only on a cache hit
+        cached = usage_metadata.cached_content_token_count
+        cached_text = f" | Cached: {cached}" if cached else ""
+        return (
+            f"{log_text} | Prompt: {usage_metadata.prompt_token_count}{cached_text}"
+            f" | Response: {usage_metadata.candidates_token_count}{thoughts_text}"
+            f" | Total: {usage_metadata.total_token_count}"
+        )
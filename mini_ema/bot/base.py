@@ -1,7 +1,8 @@
 """Base bot interface for Mini Ema."""
 
+import asyncio
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from collections.abc import AsyncIterator, Iterator
 
 
 class BaseBot(ABC):
@@ -20,7 +21,7 @@ class BaseBot(ABC):
         pass
 
     @abstractmethod
-    def get_response(self, message: str, username: str = "Phoenix") -> Iterable[dict]:
+    def get_response(self, message: str, username: str = "Phoenix") -> Iterator[dict]:
         """Generate a response to a user message.
 
         Args:
@@ -33,5 +34,29 @@ class BaseBot(ABC):
                 - role: "assistant"
                 - content: The message text
                 - metadata: Optional dict with title and other metadata
+
+            Streaming bots may mark a message with a top-level "pending": True key; the next
+            message then replaces its content in the same bubble instead of starting a
+            new one, so pending messages carry the full text generated so far. The flag is
+            kept out of metadata, which is shown by the chat UI.
         """
         pass
+
+    async def aget_response(self, message: str, username: str = "Phoenix") -> AsyncIterator[dict]:
+        """Asynchronously generate a response to a user message.
+
+        The default implementation runs the synchronous get_response generator in a
+        worker thread, so blocking bots do not stall the event loop. Bots with native
+        async support should override this method.
+
+        Args:
+            message: The user's message
+            username: The name of the user (default: "Phoenix")
+
+        Yields:
+            Message dictionaries with the same structure as get_response.
+        """
+        iterator = iter(self.get_response(message, username))
+        sentinel = object()
+        while (msg := await asyncio.to_thread(next, iterator, sentinel)) is not sentinel:
+            yield msg
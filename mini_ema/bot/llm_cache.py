@@ -0,0 +1,81 @@
+"""Exact-match response cache for Mini Ema bots."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+def make_cache_key(**parts: Any) -> str:
+    """Build a stable cache key from JSON-serializable request parts.
+
+    Args:
+        **parts: Request parts that determine the response (model, history, message, ...).
+
+    Returns:
+        Hex digest of the parts serialized with sorted keys.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class LLMCache:
+    """Thread-safe LRU cache for LLM responses keyed by exact request content."""
+
+    def __init__(self, max_entries: int = 512, ttl: float | None = None):
+        """Initialize the response cache.
+
+        Args:
+            max_entries: Maximum number of cached responses.
+            ttl: Seconds an entry stays valid after it is stored. If None, entries never expire.
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        """Get the cached value for a key, marking it as recently used.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The cached value, or None if the key is not cached or has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: The cache key.
+            value: The value to cache.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of cached entries, including expired ones not yet evicted."""
+        with self._lock:
+            return len(self._entries)
@@ -1,16 +1,18 @@
 """Pretty Gemini bot with structured outputs and character personality."""
 
+import json
 import os
+import re
 import threading
-from collections.abc import Iterable
-from typing import Any, Literal
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, Literal, get_args
 
-from google import genai
 from google.genai import types
-from google.genai.errors import APIError
 from pydantic import BaseModel, Field
 
-from .bare_gemini_bot import BareGeminiBot
+from .bare_gemini_bot import _THINKING_LEVELS, BareGeminiBot, _get_client, _StreamBuffer, _thinking_config, _Turn
+from .llm_cache import LLMCache, make_cache_key
+from .semantic_cache import SemanticCache
 
 
 class ConversationHistory:
@@ -19,6 +21,14 @@ class ConversationHistory:
     This class manages conversation history with a maximum number of rounds,
     ensuring thread-safe operations when multiple threads access the history.
     Each round consists of 2 messages (user message + assistant response).
+
+    The history is append-only between resets, so the prompt prefix sent to the
+    model stays identical across turns and Gemini's implicit prefix cache can be
+    reused. Once it grows past twice the maximum capacity, it is reset to the most
+    recent max_capacity messages.
+
+    The messages are kept in an immutable tuple that writers replace under a lock,
+    so readers can load the current snapshot without locking.
     """
 
     def __init__(self):
@@ -27,7 +37,7 @@ class ConversationHistory:
         Reads max_rounds from PRETTY_GEMINI_BOT_HISTORY_LENGTH environment variable.
         """
         self._lock = threading.Lock()
-        self._history: list[Any] = []
+        self._snapshot: tuple[Any, ...] = ()
         # Read max_rounds from environment variable
         history_length_str = os.getenv("PRETTY_GEMINI_BOT_HISTORY_LENGTH", "10")
         max_rounds = max(0, int(history_length_str))
@@ -37,29 +47,47 @@ class ConversationHistory:
     def add_messages(self, messages: list[Any]) -> None:
         """Add messages to the conversation history in a thread-safe manner.
 
-        Messages are appended to the history and automatically trimmed to max_capacity.
+        Messages are appended to the history. When the history exceeds twice the
+        max_capacity, it is trimmed back to the last max_capacity messages.
 
         Args:
             messages: List of messages to add to the history.
         """
+        # Nothing is kept when history is disabled, so skip the lock and the copy
+        if not self._max_capacity:
+            return
         with self._lock:
-            self._history.extend(messages)
-            # Always trim to max_capacity
-            self._history = self._history[-self._max_capacity :] if self._max_capacity > 0 else []
+            history = self._snapshot + tuple(messages)
+            # Only trim once the window has doubled, keeping the prefix stable in between
+            if len(history) > 2 * self._max_capacity:
+                history = history[-self._max_capacity :]
+            self._snapshot = history
 
     def get_recent_messages(self) -> list[Any]:
-        """Get all messages in the conversation history in a thread-safe manner.
+        """Get all messages in the conversation history.
+
+        Reading the snapshot attribute is atomic, so no lock is needed.
 
         Returns:
             List of all messages in the history.
         """
-        with self._lock:
-            return self._history.copy()
+        return list(self._snapshot)
+
+    def get_snapshot(self) -> tuple[Any, ...]:
+        """Get the conversation history as an immutable tuple, without copying it.
+
+        Writers replace the tuple instead of changing it, so the snapshot can be kept
+        and sent with a request while other turns are recorded.
+
+        Returns:
+            Tuple of all messages in the history.
+        """
+        return self._snapshot
 
     def clear(self) -> None:
         """Clear all conversation history in a thread-safe manner."""
         with self._lock:
-            self._history = []
+            self._snapshot = ()
 
 
 class EmaMessage(BaseModel):
@@ -75,6 +103,28 @@ class EmaMessage(BaseModel):
     speak: str = Field(description="The character's spoken words to the user.")
 
 
+# Indicator tags shown for each non-neutral expression and action, e.g. "[Expression: smile]"
+EXPRESSION_INDICATORS = {
+    expression: f"[Expression: {expression}]"
+    for expression in get_args(EmaMessage.model_fields["expression"].annotation)
+    if expression != "neutral"
+}
+ACTION_INDICATORS = {
+    action: f"[Action: {action}]"
+    for action in get_args(EmaMessage.model_fields["action"].annotation)
+    if action != "none"
+}
+
+# Emoji representing each expression
+EXPRESSION_EMOJIS = {
+    "neutral": "😐",
+    "smile": "😊",
+    "serious": "😤",
+    "confused": "😕",
+    "surprised": "😲",
+    "sad": "😢",
+}
+
 SYSTEM_INSTRUCTION = """You are Ema, a helpful AI assistant with knowledge about various topics.
 
 You are knowledgeable and friendly, focusing on providing clear and helpful responses in a natural, conversational way.
@@ -92,8 +142,57 @@ Important guidelines:
 
 Always respond in the same language as the user's input. If they write in English, respond in English. If they write in Chinese, respond in Chinese."""
 
-# Number of messages per conversation round (user message + assistant response)
-MESSAGES_PER_ROUND = 2
+# Pattern matching the start of a string field in the streamed EmaMessage JSON
+FIELD_START_PATTERN = re.compile(r'"(think|expression|action|speak)"\s*:\s*"')
+
+
+def _parse_partial_fields(text: str) -> tuple[dict[str, str], set[str]]:
+    """Extract the string fields of a partially streamed EmaMessage JSON object.
+
+    Args:
+        text: The JSON text received so far
+
+    Returns:
+        Tuple of (fields, closed), where fields maps field names to their text so far
+        and closed holds the names of fields whose value is complete
+    """
+    fields = {}
+    closed = set()
+    pos = 0
+    while match := FIELD_START_PATTERN.search(text, pos):
+        # Find the closing quote, skipping escaped characters
+        start = end = match.end()
+        while end < len(text) and text[end] != '"':
+            end += 2 if text[end] == "\\" else 1
+        raw = text[start:end]
+
+        # An unfinished value may end inside an escape sequence, so trim it until it decodes
+        for cut in range(7):
+            try:
+                fields[match.group(1)] = json.loads(f'"{raw[: len(raw) - cut]}"')
+                break
+            except ValueError:
+                continue
+        if end >= len(text):
+            break
+        closed.add(match.group(1))
+        pos = end + 1
+    return fields, closed
+
+
+# Gemini schema for EmaMessage, converted once at import instead of from the Pydantic model on
+# every request. Properties keep their declared order so the thoughts are streamed first.
+EMA_MESSAGE_SCHEMA = types.Schema.from_json_schema(
+    json_schema=types.JSONSchema(**EmaMessage.model_json_schema()), api_option="GEMINI_API"
+).model_copy(update={"property_ordering": list(EmaMessage.model_fields)})
+
+# Per-message config enforcing the character's system instruction and structured output.
+# Built once and shared by all requests; the SDK copies configs before converting them.
+RESPONSE_CONFIG = types.GenerateContentConfig(
+    system_instruction=SYSTEM_INSTRUCTION,
+    response_mime_type="application/json",
+    response_schema=EMA_MESSAGE_SCHEMA,
+)
 
 
 class PrettyGeminiBot(BareGeminiBot):
@@ -101,9 +200,20 @@ class PrettyGeminiBot(BareGeminiBot):
 
     This bot uses Pydantic models to enforce a structured response format that includes
     the character's thoughts, expressions, actions, and spoken words.
+
+    Responses are streamed by the inherited get_response and aget_response, with the
+    content formatted from the fields of the structured message received so far.
     """
 
-    def __init__(self, api_key: str | None = None, model: str | None = None, thinking_level: str | None = None):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        model: str | None = None,
+        thinking_level: str | None = None,
+        response_cache: LLMCache | None = None,
+        semantic_cache: SemanticCache | None = None,
+        thinking_budget: int | None = None,
+    ):
         """Initialize the Pretty Gemini bot.
 
         Args:
@@ -111,6 +221,14 @@ class PrettyGeminiBot(BareGeminiBot):
             model: Model name to use. If None, reads from GEMINI_MODEL env var or uses default.
             thinking_level: Thinking level (MINIMAL, LOW, MEDIUM, HIGH). If None, reads from
                 PRETTY_GEMINI_BOT_THINKING_LEVEL env var or uses MINIMAL as default.
+            response_cache: Cache used to answer exactly repeated requests (same model, history,
+                username, and message) without calling the model. If None, one is created when
+                PRETTY_GEMINI_BOT_RESPONSE_CACHE env var is set to 1.
+            semantic_cache: Cache used to answer near-duplicate messages without calling the model.
+                If None, one is created when PRETTY_GEMINI_BOT_SEMANTIC_CACHE_THRESHOLD env var is set.
+            thinking_budget: Thinking token budget replacing the thinking level, for models that
+                use budgets (0 disables thinking). If None, reads from PRETTY_GEMINI_BOT_THINKING_BUDGET
+                env var (optional).
         """
         # Get API key from parameter or environment variable
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
@@ -124,103 +242,238 @@ class PrettyGeminiBot(BareGeminiBot):
 
         # Get thinking level from parameter or environment variable
         thinking_level_str = thinking_level or os.getenv("PRETTY_GEMINI_BOT_THINKING_LEVEL", "MINIMAL")
-        self.thinking_level = getattr(types.ThinkingLevel, thinking_level_str.upper(), types.ThinkingLevel.MINIMAL)
+        self.thinking_level = _THINKING_LEVELS.get(thinking_level_str.upper(), types.ThinkingLevel.MINIMAL)
+        thinking_budget_str = os.getenv("PRETTY_GEMINI_BOT_THINKING_BUDGET")
+        if thinking_budget is None and thinking_budget_str:
+            thinking_budget = int(thinking_budget_str)
+        self.thinking_budget = thinking_budget
+
+        # Build the request config once, adding the thinking settings to the shared response config
+        self._response_config = RESPONSE_CONFIG.model_copy(
+            update={"thinking_config": _thinking_config(self.thinking_level, self.thinking_budget)}
+        )
 
-        # Initialize the Gemini client
-        self.client = genai.Client(api_key=self.api_key)
+        # Get the Gemini client shared by all bots using this API key
+        self.client = _get_client(self.api_key)
 
         # Initialize thread-safe conversation history manager
         self.conversation_history = ConversationHistory()
 
+        # Optional exact-match response cache (disabled unless configured)
+        if response_cache is None and os.getenv("PRETTY_GEMINI_BOT_RESPONSE_CACHE") == "1":
+            ttl_str = os.getenv("PRETTY_GEMINI_BOT_RESPONSE_CACHE_TTL")
+            response_cache = LLMCache(ttl=float(ttl_str) if ttl_str else None)
+        self.response_cache = response_cache
+
+        # Optional semantic response cache (disabled unless configured)
+        threshold_str = os.getenv("PRETTY_GEMINI_BOT_SEMANTIC_CACHE_THRESHOLD")
+        if semantic_cache is None and threshold_str:
+            semantic_cache = SemanticCache(threshold=float(threshold_str))
+        self.semantic_cache = semantic_cache
+        self.embedding_model = os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-001")
+
+        # Coalesce streamed chunks into partial messages by size or time
+        self.stream_flush_chars = int(os.getenv("PRETTY_GEMINI_BOT_STREAM_FLUSH_CHARS", "64"))
+        self.stream_flush_interval = int(os.getenv("PRETTY_GEMINI_BOT_STREAM_FLUSH_MS", "50")) / 1000
+
     def clear(self):
         """Clear conversation history."""
         self.conversation_history.clear()
 
-    def get_response(self, message: str, username: str = "Phoenix") -> Iterable[dict]:
-        """Generate a structured response using Gemini API with character personality.
+    def _format_user_message(self, message: str, username: str) -> str:
+        """Format the user message with XML tags to separate username and message.
 
         Args:
             message: The user's message
-            username: The name of the user (default: "Phoenix")
+            username: The name of the user
 
-        Yields:
-            Message dictionaries with role, content, and metadata.
-            Each dictionary has:
-                - role: "assistant"
-                - content: Formatted message with character's thoughts, expression, action, and speech
-                - metadata: Dict with title and log information
+        Returns:
+            The formatted message sent to the model
         """
-        try:
-            # Format the message with XML tags to separate username and message
-            formatted_message = f"<username>{username}</username>\n<user_message>{message}</user_message>"
+        return f"<username>{username}</username>\n<user_message>{message}</user_message>"
 
-            # Get the recent N rounds of history from the thread-safe history manager
-            recent_history = self.conversation_history.get_recent_messages()
+    def _start_turn(self, message: str, username: str) -> _Turn:
+        """Start a turn with the recent history, answering it from the response cache on a hit.
 
-            # Create a new chat session with the recent history
-            chat = self.client.chats.create(
+        Args:
+            message: The user's message
+            username: The name of the user
+
+        Returns:
+            The turn, with its cached message set on a cache hit
+        """
+        formatted_message = self._format_user_message(message, username)
+        recent_history = self.conversation_history.get_snapshot()
+        turn = _Turn(message, formatted_message, _StreamBuffer(self.stream_flush_chars, self.stream_flush_interval))
+
+        # Send the recent history with the new message, without building a chat session
+        user_content = types.UserContent(parts=[types.Part.from_text(text=formatted_message)])
+        turn.contents = [*recent_history, user_content]
+
+        if self.response_cache is not None:
+            history = [content.model_dump(mode="json", exclude_none=True) for content in recent_history]
+            turn.cache_key = make_cache_key(
                 model=self.model,
-                config=types.GenerateContentConfig(
-                    thinking_config=types.ThinkingConfig(thinking_level=self.thinking_level),
-                ),
-                history=recent_history,
+                thinking_level=self.thinking_level,
+                thinking_budget=self.thinking_budget,
+                system_instruction=SYSTEM_INSTRUCTION,
+                history=history,
+                message=formatted_message,
             )
+            cached = self.response_cache.get(turn.cache_key)
+            if cached is not None:
+                turn.cached = self._replay_cached(formatted_message, cached, "Response cache hit")
+        return turn
 
-            # Send message to chat with system_instruction and response_schema in config
-            response = chat.send_message(
-                formatted_message,
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_INSTRUCTION,
-                    response_mime_type="application/json",
-                    response_schema=EmaMessage,
-                ),
-            )
+    def _stream(self, turn: _Turn) -> Iterator[types.GenerateContentResponse]:
+        """Send a turn with system_instruction and response_schema in config, streaming the response.
 
-            # Parse the structured response
-            ema_message = response.parsed
-
-            # Extract response metadata
-            finish_reason = response.candidates[0].finish_reason.value.capitalize()
-            model_version = response.model_version
-
-            # Format usage metadata using inherited method from BareGeminiBot
-            log_text = self._format_usage_log(finish_reason, response.usage_metadata, model_version)
-
-            # Format the content with character information
-            content = self._format_message(ema_message)
-
-            # Add the last 2 messages from chat history (user message and assistant response)
-            updated_history = chat.get_history()
-            self.conversation_history.add_messages(updated_history[-2:])
-
-            # Yield the response with metadata
-            yield {
-                "role": "assistant",
-                "content": content,
-                "metadata": {
-                    "title": "💡 Answer",
-                    "log": log_text,
-                },
-            }
-
-        except APIError as e:
-            # Handle API errors
-            yield {
-                "role": "assistant",
-                "content": f"API Error: {str(e)}",
-                "metadata": {
-                    "title": "❌ API Error",
-                },
-            }
-        except Exception as e:
-            # Handle other errors
-            yield {
-                "role": "assistant",
-                "content": f"Unexpected error: {str(e)}",
-                "metadata": {
-                    "title": "❌ Error",
-                },
-            }
+        Args:
+            turn: The turn being answered
+
+        Returns:
+            Iterator over the streamed response chunks
+        """
+        return self.client.models.generate_content_stream(
+            model=self.model, contents=turn.contents, config=self._response_config
+        )
+
+    async def _astream(self, turn: _Turn) -> AsyncIterator[types.GenerateContentResponse]:
+        """Send a turn through the async client, streaming the response.
+
+        Args:
+            turn: The turn being answered
+
+        Yields:
+            The streamed response chunks
+        """
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model, contents=turn.contents, config=self._response_config
+        )
+        async for response in stream:
+            yield response
+
+    def _replay_cached(self, formatted_message: str, cached_turn: tuple, log_text: str) -> dict:
+        """Record a cached answer as the latest round and build its message dictionary.
+
+        Args:
+            formatted_message: The formatted user message
+            cached_turn: Tuple of (final message dictionary, model content) stored for the answer
+            log_text: Log text describing the cache hit
+
+        Returns:
+            Message dictionary with the cached content and a cache-hit log
+        """
+        cached_message, model_content = cached_turn
+
+        # Record this round so later turns still see the exchange
+        user_content = types.UserContent(parts=[types.Part.from_text(text=formatted_message)])
+        self.conversation_history.add_messages([user_content, model_content])
+        return {
+            "role": "assistant",
+            "content": cached_message["content"],
+            "metadata": {
+                **cached_message["metadata"],
+                "log": log_text,
+            },
+        }
+
+    def _format_partial_json(self, text: str) -> str:
+        """Format the fields of a partially streamed EmaMessage.
+
+        Unfinished thoughts are shown without their closing parenthesis, and the expression
+        and action only once complete, so each update extends the previous content.
+
+        Args:
+            text: The JSON text received so far
+
+        Returns:
+            Formatted message string, or an empty string if no field has started yet
+        """
+        fields, closed = _parse_partial_fields(text)
+        if "think" not in fields:
+            return ""
+        if "think" not in closed:
+            return f"*({fields['think']}"
+        ema_message = EmaMessage.model_construct(
+            think=fields["think"],
+            expression=fields["expression"] if "expression" in closed else "neutral",
+            action=fields["action"] if "action" in closed else "none",
+            speak=fields.get("speak", ""),
+        )
+        return self._format_message(ema_message)
+
+    def _partial_content(self, text: str) -> str:
+        """Show the fields of the JSON object as they arrive.
+
+        Args:
+            text: The JSON text received so far
+
+        Returns:
+            Formatted message string, or an empty string if no field has started yet
+        """
+        return self._format_partial_json(text)
+
+    def _finish_turn(self, turn: _Turn) -> dict:
+        """Record a finished turn in the history and build its message dictionary.
+
+        Args:
+            turn: The turn being answered, after its response has been streamed
+
+        Returns:
+            Message dictionary with role, content, and metadata
+        """
+        text = turn.buffer.text
+        final_message = self._format_response(turn.finished or turn.response, text)
+
+        # Record the round as the user message and a single model content holding the whole answer
+        model_content = types.ModelContent(parts=[types.Part.from_text(text=text)])
+        self.conversation_history.add_messages([turn.contents[-1], model_content])
+
+        # Cache the answer together with the model content recorded in history
+        self._store_cached(turn.cache_key, turn.embedding, (final_message, model_content))
+        return final_message
+
+    def _format_response(self, response: types.GenerateContentResponse, text: str) -> dict:
+        """Build the final assistant message dictionary for a structured Gemini response.
+
+        Args:
+            response: The response chunk that finished the stream
+            text: The complete JSON text of the structured response
+
+        Returns:
+            Message dictionary with role, content, and metadata
+        """
+        # Parse the structured response
+        ema_message = EmaMessage.model_validate_json(text)
+
+        # Extract response metadata
+        finish_reason = self._finish_reason_text(response)
+        model_version = response.model_version
+
+        # Format usage metadata using inherited method from BareGeminiBot
+        log_text = self._format_usage_log(finish_reason, response.usage_metadata, model_version)
+
+        return {
+            "role": "assistant",
+            "content": self._format_message(ema_message),
+            "metadata": {
+                "title": "💡 Answer",
+                "log": log_text,
+            },
+        }
+
+    def _one_shot_request(self, message: str, username: str) -> tuple[str, types.GenerateContentConfig]:
+        """Build the contents and config for answering a message without conversation history.
+
+        Args:
+            message: The user's message
+            username: The name of the user
+
+        Returns:
+            Tuple of (contents, config) with the character's system instruction and response schema
+        """
+        return self._format_user_message(message, username), self._response_config
 
     def _format_message(self, ema_message: EmaMessage) -> str:
         """Format the EmaMessage into a readable string.
@@ -231,27 +484,16 @@ class PrettyGeminiBot(BareGeminiBot):
         Returns:
             Formatted message string with thoughts, expression, action, and speech
         """
-        parts = []
-
-        # Add thoughts (italicized with parentheses)
-        if ema_message.think:
-            parts.append(f"*({ema_message.think})*")
-
-        # Add expression and action indicators
-        indicators = []
-        if ema_message.expression and ema_message.expression != "neutral":
-            indicators.append(f"[Expression: {ema_message.expression}]")
-        if ema_message.action and ema_message.action != "none":
-            indicators.append(f"[Action: {ema_message.action}]")
+        # Thoughts (italicized with parentheses)
+        think = f"*({ema_message.think})*" if ema_message.think else ""
 
-        if indicators:
-            parts.append(" ".join(indicators))
+        # Expression and action indicators, omitted when neutral
+        expression = EXPRESSION_INDICATORS.get(ema_message.expression, "")
+        action = ACTION_INDICATORS.get(ema_message.action, "")
+        indicators = f"{expression} {action}" if expression and action else expression or action
 
-        # Add spoken words
-        if ema_message.speak:
-            parts.append(ema_message.speak)
-
-        return "\n\n".join(parts)
+        # Join the non-empty sections, ending with the spoken words
+        return "\n\n".join(filter(None, (think, indicators, ema_message.speak)))
 
     def _get_emoji(self, expression: str) -> str:
         """Get emoji for the given expression.
@@ -262,12 +504,4 @@ class PrettyGeminiBot(BareGeminiBot):
         Returns:
             Emoji representing the expression
         """
-        emoji_map = {
-            "neutral": "😐",
-            "smile": "😊",
-            "serious": "😤",
-            "confused": "😕",
-            "surprised": "😲",
-            "sad": "😢",
-        }
-        return emoji_map.get(expression, "💬")
+        return EXPRESSION_EMOJIS.get(expression, "💬")
@@ -0,0 +1,104 @@
+"""Embedding-similarity response cache for Mini Ema bots."""
+
+import threading
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+
+class SemanticCache:
+    """Thread-safe cache that returns stored responses for semantically similar prompts.
+
+    Prompt embeddings are kept normalized in a single preallocated matrix, so a lookup
+    is one matrix-vector product over all stored prompts. When the cache is full, the
+    least recently used entry is evicted.
+    """
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 1024):
+        """Initialize the semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a stored prompt to count as a hit.
+            max_entries: Maximum number of cached prompts.
+        """
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._embeddings: np.ndarray | None = None
+        self._values: list[Any] = []
+        self._last_used = np.zeros(self.max_entries, dtype=np.int64)
+        self._clock = 0
+
+    def get(self, embedding: Sequence[float]) -> tuple[Any, float] | None:
+        """Look up the cached value for the most similar stored prompt.
+
+        Args:
+            embedding: Embedding of the incoming prompt.
+
+        Returns:
+            Tuple of (cached value, similarity), or None if no stored prompt is similar enough.
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            if not self._values or self._embeddings.shape[1] != query.shape[0]:
+                return None
+            similarities = self._embeddings[: len(self._values)] @ query
+            index = int(np.argmax(similarities))
+            similarity = float(similarities[index])
+            if similarity < self.threshold:
+                return None
+            self._clock += 1
+            self._last_used[index] = self._clock
+            return self._values[index], similarity
+
+    def add(self, embedding: Sequence[float], value: Any) -> None:
+        """Store a value for a prompt embedding, evicting the least recently used entry if full.
+
+        Args:
+            embedding: Embedding of the prompt.
+            value: Value to return for similar prompts.
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._embeddings is None or self._embeddings.shape[1] != vector.shape[0]:
+                # Allocate storage on first insert, once the embedding size is known
+                self._embeddings = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._values = []
+
+            if len(self._values) < self.max_entries:
+                index = len(self._values)
+                self._values.append(value)
+            else:
+                index = int(np.argmin(self._last_used))
+                self._values[index] = value
+
+            self._embeddings[index] = vector
+            self._clock += 1
+            self._last_used[index] = self._clock
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._embeddings = None
+            self._values = []
+            self._last_used[:] = 0
+
+    def __len__(self) -> int:
+        """Return the number of cached entries."""
+        with self._lock:
+            return len(self._values)
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector.
+
+        Args:
+            embedding: The embedding values.
+
+        Returns:
+            Normalized embedding vector.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
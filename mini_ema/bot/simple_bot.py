@@ -1,6 +1,6 @@
 """Simple hardcoded bot implementation."""
 
-from collections.abc import Iterable
+from collections.abc import Iterator
 
 from .base import BaseBot
 
@@ -16,7 +16,7 @@ class SimpleBot(BaseBot):
         """Clear conversation history (no-op for SimpleBot)."""
         pass
 
-    def get_response(self, message: str, username: str = "Phoenix") -> Iterable[dict]:
+    def get_response(self, message: str, username: str = "Phoenix") -> Iterator[dict]:
         """Get hardcoded AI response as structured messages.
 
         Args:
@@ -3,7 +3,25 @@
 This module provides the user interface components for the chat application.
 """
 
-from .chat_ui import EMA_AVATAR, STREAMING_DELAY, USER_AVATAR, ChatUI
+from .chat_ui import (
+    CHUNK_SIZE,
+    CONCURRENCY_LIMIT,
+    EMA_AVATAR,
+    FRAME_INTERVAL,
+    QUEUE_MAX_SIZE,
+    STREAMING_DELAY,
+    USER_AVATAR,
+    ChatUI,
+)
 
 
-__all__ = ["EMA_AVATAR", "STREAMING_DELAY", "USER_AVATAR", "ChatUI"]
+__all__ = [
+    "CHUNK_SIZE",
+    "CONCURRENCY_LIMIT",
+    "EMA_AVATAR",
+    "FRAME_INTERVAL",
+    "QUEUE_MAX_SIZE",
+    "STREAMING_DELAY",
+    "USER_AVATAR",
+    "ChatUI",
+]
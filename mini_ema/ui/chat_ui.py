@@ -1,16 +1,31 @@
 """Chat UI components for Mini Ema."""
 
+import asyncio
+import functools
 import os
 import re
+import sys
+import threading
 import time
-
-import gradio as gr
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING
 
 from ..bot.base import BaseBot
 
 
+if TYPE_CHECKING:
+    import gradio as gr
+
+
 # Streaming configuration
-STREAMING_DELAY = 0.02  # Delay between characters in seconds
+STREAMING_DELAY = 0.0  # Default typing delay per character in seconds, overridden by the STREAMING_DELAY env var
+FRAME_INTERVAL = 0.05  # Minimum interval between UI updates in seconds
+CHUNK_SIZE = 4  # Number of characters emitted per streaming step
+
+# Queue configuration - how many responses stream at once, and how many requests may wait.
+# Defaults, overridden by the CONCURRENCY_LIMIT and QUEUE_MAX_SIZE env vars
+CONCURRENCY_LIMIT = 16
+QUEUE_MAX_SIZE = 64
 
 # Avatar images - configurable via environment variables
 USER_AVATAR = os.getenv("USER_AVATAR", "assets/imgs/user.png")
@@ -19,6 +34,123 @@ EMA_AVATAR = os.getenv("EMA_AVATAR", "assets/imgs/ema.png")
 # Expression images directory
 EXPRESSION_IMGS_DIR = os.getenv("EXPRESSION_IMGS_DIR", "assets/gen_imgs")
 
+# Tag names recognized in AI responses, e.g. [Expression: smile] or [Action: wave]
+TAG_NAMES = ("expression", "action")
+MAX_TAG_NAME_LENGTH = max(len(name) for name in TAG_NAMES)
+
+# Precompiled pattern for collapsing blank lines left behind by removed tags
+EXTRA_NEWLINES_PATTERN = re.compile(r"\n\s*\n\s*\n")
+
+
+def _find_tags(content: str):
+    """Find expression/action tags in a single pass over the content.
+
+    Tags have the form "[<Name>: <word>]", where the name is matched case-insensitively.
+
+    Args:
+        content: The text to scan
+
+    Yields:
+        Tuples of (start, end, name, value) for every tag found, in order
+    """
+    pos = 0
+    while (start := content.find("[", pos)) != -1:
+        pos = start + 1
+        colon = content.find(":", pos)
+        if colon == -1:
+            break
+        if colon - pos > MAX_TAG_NAME_LENGTH or content[pos:colon].lower() not in TAG_NAMES:
+            continue
+        name = content[pos:colon].lower()
+
+        # Skip whitespace, then read the word up to the closing bracket
+        value_start = colon + 1
+        while value_start < len(content) and content[value_start].isspace():
+            value_start += 1
+        end = content.find("]", value_start)
+        if end == -1:
+            break
+        value = content[value_start:end]
+        if value and all(char.isalnum() or char == "_" for char in value):
+            yield start, end + 1, name, value
+            pos = end + 1
+
+
+def _parse_tags(content: str) -> tuple[str, str, str]:
+    """Parse expression and action tags from content and remove them.
+
+    Args:
+        content: The AI response content
+
+    Returns:
+        Tuple of (expression, action, cleaned_content)
+    """
+    # Default values
+    expression = "neutral"
+    action = "none"
+
+    # Scan the tags once: the first of each kind wins, and all of them are removed
+    found = {}
+    segments = []
+    pos = 0
+    for start, end, name, value in _find_tags(content):
+        found.setdefault(name, value.lower())
+        segments.append(content[pos:start])
+        pos = end
+    segments.append(content[pos:])
+    expression = found.get("expression", expression)
+    action = found.get("action", action)
+
+    cleaned_content = "".join(segments)
+    # Clean up extra whitespace and newlines
+    cleaned_content = EXTRA_NEWLINES_PATTERN.sub("\n\n", cleaned_content)
+    cleaned_content = cleaned_content.strip()
+
+    return expression, action, cleaned_content
+
+
+# Parsing is pure, so final answers are memoized: bots that repeat the same response
+# (canned or cached answers) skip the scan entirely. Streamed partial messages are
+# almost never seen twice, so they are parsed without the cache to avoid evicting answers
+_parse_final_tags = functools.lru_cache(maxsize=128)(_parse_tags)
+
+
+async def _error_response(content: str):
+    """Yield a single error message, in the same format as bot responses.
+
+    Args:
+        content: The error description
+
+    Yields:
+        Message dictionary describing the error
+    """
+    yield {"role": "assistant", "content": content, "metadata": {"title": "❌ Error"}}
+
+
+@functools.lru_cache(maxsize=256)
+def _expression_image_path(expression: str, action: str) -> str:
+    """Resolve the image for an expression/action pair, falling back to the default avatar.
+
+    The images are static assets, so each pair only hits the filesystem once.
+
+    Args:
+        expression: The facial expression
+        action: The physical action
+
+    Returns:
+        Path to the expression image file, or default avatar if not found
+    """
+    # Build the image filename
+    image_filename = f"{expression}_{action}.jpg"
+    image_path = os.path.join(EXPRESSION_IMGS_DIR, image_filename)
+
+    # Check if the image exists
+    if os.path.exists(image_path):
+        return image_path
+    else:
+        # Fallback to default avatar
+        return EMA_AVATAR
+
 
 class ChatUI:
     """Gradio-based chat interface for Mini Ema.
@@ -27,19 +159,81 @@ class ChatUI:
     for creating and launching the chat application.
     """
 
-    def __init__(self, bots: dict[str, BaseBot], streaming_delay: float = STREAMING_DELAY):
+    def __init__(
+        self,
+        bots: dict[str, BaseBot | Callable[[], BaseBot]],
+        streaming_delay: float | None = None,
+        frame_interval: float = FRAME_INTERVAL,
+        chunk_size: int = CHUNK_SIZE,
+        concurrency_limit: int | None = None,
+        queue_max_size: int | None = None,
+        on_load: Callable[[], Awaitable[None]] | None = None,
+    ):
         """Initialize the chat UI.
 
         Args:
-            bots: Dictionary of bot name -> bot instance
-            streaming_delay: Delay between characters when streaming (seconds)
+            bots: Dictionary of bot name -> bot instance, or a factory that creates the bot
+                when it is first used
+            streaming_delay: Delay between characters when streaming (seconds), 0 to show text as
+                soon as it arrives. If None, reads from STREAMING_DELAY env var or uses STREAMING_DELAY.
+            frame_interval: Minimum interval between UI updates when streaming (seconds)
+            chunk_size: Number of characters emitted per typing step, when streaming_delay is set
+            concurrency_limit: Number of bot responses streamed at the same time. Responses are
+                async and mostly wait on the model, so a higher limit costs little CPU, but each
+                active response keeps its partial history in memory. If None, reads from
+                CONCURRENCY_LIMIT env var or uses CONCURRENCY_LIMIT.
+            queue_max_size: Number of requests that may wait for a free slot before new ones are rejected.
+                If None, reads from QUEUE_MAX_SIZE env var or uses QUEUE_MAX_SIZE.
+            on_load: Coroutine function run once per process on the app's event loop, when the
+                page is first loaded, e.g. to open connections before the user sends a message
         """
         self.bots = bots
+        self._bots_lock = threading.Lock()
+        # Read the environment here rather than at import, so values loaded from .env apply
+        if streaming_delay is None:
+            streaming_delay = float(os.getenv("STREAMING_DELAY", STREAMING_DELAY))
+        if concurrency_limit is None:
+            concurrency_limit = int(os.getenv("CONCURRENCY_LIMIT", CONCURRENCY_LIMIT))
+        if queue_max_size is None:
+            queue_max_size = int(os.getenv("QUEUE_MAX_SIZE", QUEUE_MAX_SIZE))
         self.streaming_delay = streaming_delay
+        self.frame_interval = frame_interval
+        self.chunk_size = max(1, chunk_size)
+        self.concurrency_limit = max(1, concurrency_limit)
+        self.queue_max_size = queue_max_size
+        self.on_load = on_load
+        self._on_load_task: asyncio.Task | None = None
+        self._demo = None
+
+    def _get_bot(self, name: str, create: bool = True) -> BaseBot | None:
+        """Get a bot instance by name, creating it from its factory on first use.
+
+        Args:
+            name: Name of the bot
+            create: Whether to create the bot if it has not been instantiated yet
+
+        Returns:
+            The bot instance, or None if the bot is unknown or not created yet
+        """
+        bot = self.bots.get(name)
+        if bot is None or isinstance(bot, BaseBot):
+            return bot
+        if not create:
+            return None
+        with self._bots_lock:
+            # Re-check under the lock in case another session created it first
+            bot = self.bots[name]
+            if not isinstance(bot, BaseBot):
+                bot = bot()
+                self.bots[name] = bot
+            return bot
 
     def _user_message(self, user_message: str, history: list):
         """Add user message to history.
 
+        The message is appended in place, so the same history list is passed on
+        to _bot_response.
+
         Args:
             user_message: User's message
             history: Chat history
@@ -47,13 +241,16 @@ class ChatUI:
         Returns:
             Tuple of (empty string, updated history)
         """
-        return "", history + [{"role": "user", "content": user_message}]
+        history.append({"role": "user", "content": user_message})
+        return "", history
 
-    def _parse_expression_and_action(self, content: str) -> tuple[str, str, str]:
+    def _parse_expression_and_action(self, content: str, final: bool = True) -> tuple[str, str, str]:
         """Parse expression and action from AI response content and remove tags.
 
         Args:
             content: The AI response content
+            final: Whether the content is a complete message, whose result is memoized,
+                rather than a partial message still being streamed
 
         Returns:
             Tuple of (expression, action, cleaned_content)
@@ -61,27 +258,7 @@ class ChatUI:
             - action: The physical action
             - cleaned_content: Content with expression/action tags removed
         """
-        # Default values
-        expression = "neutral"
-        action = "none"
-
-        # Try to match expression pattern: [Expression: <expression>]
-        expression_match = re.search(r"\[Expression:\s*(\w+)\]", content, re.IGNORECASE)
-        if expression_match:
-            expression = expression_match.group(1).lower()
-
-        # Try to match action pattern: [Action: <action>]
-        action_match = re.search(r"\[Action:\s*(\w+)\]", content, re.IGNORECASE)
-        if action_match:
-            action = action_match.group(1).lower()
-
-        # Remove expression and action tags from content in a single pass
-        cleaned_content = re.sub(r"\[(Expression|Action):\s*\w+\]", "", content, flags=re.IGNORECASE)
-        # Clean up extra whitespace and newlines
-        cleaned_content = re.sub(r"\n\s*\n\s*\n", "\n\n", cleaned_content)
-        cleaned_content = cleaned_content.strip()
-
-        return expression, action, cleaned_content
+        return _parse_final_tags(content) if final else _parse_tags(content)
 
     def _get_expression_image_path(self, expression: str, action: str) -> str:
         """Get the path to the expression image.
@@ -93,30 +270,35 @@ class ChatUI:
         Returns:
             Path to the expression image file, or default avatar if not found
         """
-        # Build the image filename
-        image_filename = f"{expression}_{action}.jpg"
-        image_path = os.path.join(EXPRESSION_IMGS_DIR, image_filename)
+        return _expression_image_path(expression, action)
 
-        # Check if the image exists
-        if os.path.exists(image_path):
-            return image_path
-        else:
-            # Fallback to default avatar
-            return EMA_AVATAR
-
-    def _bot_response(self, history: list, selected_bot: str, username: str):
+    async def _bot_response(self, history: list, selected_bot: str, username: str):
         """Generate AI response with streaming.
 
+        This is an async generator, so streaming pauses and bot calls do not block
+        other sessions served by the same event loop.
+
+        The history is mutated in place and the same list is yielded on every update,
+        so earlier messages stay unchanged between frames. Do not rebuild it per yield.
+
         Args:
             history: Chat history
             selected_bot: Name of the selected bot
             username: The name of the user
 
         Yields:
-            Tuple of (updated history, expression image path)
+            Tuple of (updated history, expression image path). The image is only sent when it
+            changes, and is gr.skip() otherwise so the image component is not re-rendered.
         """
         # Get the selected bot instance
-        current_bot = self.bots.get(selected_bot, next(iter(self.bots.values())))
+        if selected_bot not in self.bots:
+            selected_bot = next(iter(self.bots))
+        try:
+            current_bot = self._get_bot(selected_bot)
+        except Exception as e:
+            # Bots created on first use may fail (e.g. without an API key), so show why in the chat
+            current_bot = None
+            startup_error = f"Could not start {selected_bot}: {e}"
 
         # Get the AI response as an iterable of structured messages
         # Extract user message - handle both string and list formats
@@ -129,47 +311,112 @@ class ChatUI:
             elif isinstance(content, list):
                 # Case 2: content is a list like [{'text': 'hello', 'type': 'text'}]
                 # Extract text from all items in the list
-                text_parts = []
-                for item in content:
-                    if isinstance(item, dict) and "text" in item:
-                        text_parts.append(item["text"])
-                user_msg = " ".join(text_parts)
+                user_msg = " ".join(item["text"] for item in content if isinstance(item, dict) and "text" in item)
             else:
                 user_msg = str(content)
 
-        ai_messages = current_bot.get_response(user_msg, username)
-
-        # Stream each message as a separate bubble
-        for msg in ai_messages:
+        if current_bot is None:
+            ai_messages = _error_response(startup_error)
+        else:
+            ai_messages = current_bot.aget_response(user_msg, username)
+
+        # Gradio is imported lazily, and is already loaded whenever a response is streamed
+        import gradio as gr
+
+        # Bind streaming settings and timing functions to locals for the chunk loop
+        streaming_delay = self.streaming_delay
+        # Without a typing delay, each message is passed through whole as soon as the bot yields it
+        chunk_size = self.chunk_size if streaming_delay else sys.maxsize
+        frame_interval = self.frame_interval
+        sleep = asyncio.sleep
+        monotonic = time.monotonic
+        shown_image = None
+
+        # Stream each message as a separate bubble. A message marked as pending is
+        # continued by the next one, which carries the full text generated so far.
+        continue_bubble = False
+        async for msg in ai_messages:
             # Get complete content and parse expression/action once
             content = msg.get("content", "")
-            expression, action, cleaned_content = self._parse_expression_and_action(content)
+            expression, action, cleaned_content = self._parse_expression_and_action(
+                content, final=not msg.get("pending", False)
+            )
             image_path = self._get_expression_image_path(expression, action)
+            metadata = msg.get("metadata")
+
+            # Only send the expression image with the first update after it changes
+            image_update = gr.skip() if image_path == shown_image else image_path
+            shown_image = image_path
+
+            if continue_bubble:
+                # Only stream the text that is not displayed yet
+                shown = history[-1]["content"]
+                if cleaned_content.startswith(shown):
+                    parts = [shown]
+                    cleaned_content = cleaned_content[len(shown) :]
+                else:
+                    parts = []
+                if metadata is not None:
+                    history[-1]["metadata"] = {**metadata}
+            else:
+                # Create a new bubble for each message.
+                # The bot's metadata is copied, since bots may reuse message dicts (e.g. cache hits)
+                new_message = {
+                    "role": "assistant",
+                    "content": "",
+                    "metadata": {**(metadata or {})},
+                }
+                history.append(new_message)
+                parts = []
+
+            continue_bubble = msg.get("pending", False)
+
+            # Stream the cleaned content in token-sized chunks, but only push an update
+            # to the UI once per frame to avoid re-rendering on every chunk.
+            # Chunks are collected in a list and only joined when flushing to the UI,
+            # avoiding quadratic string concatenation on long responses
+            bubble = history[-1]
+            last_yield = monotonic()
+            unsent = True
+            for i in range(0, len(cleaned_content), chunk_size):
+                chunk = cleaned_content[i : i + chunk_size]
+                parts.append(chunk)
+                unsent = True
+                if streaming_delay:
+                    await sleep(streaming_delay * len(chunk))
+                now = monotonic()
+                if now - last_yield >= frame_interval:
+                    last_yield = now
+                    bubble["content"] = "".join(parts)
+                    yield history, image_update
+                    image_update = gr.skip()
+                    unsent = False
+
+            # Final yield to ensure complete state, unless the last frame already showed it.
+            # Messages without new text still get one update for their bubble and metadata
+            if unsent:
+                bubble["content"] = "".join(parts)
+                yield history, image_update
+
+    async def _run_on_load(self):
+        """Start the load hook on the first page load, and do nothing on later loads and tabs.
+
+        The hook runs as a background task on the app's event loop, so the page load
+        does not wait for it.
+        """
+        if self._on_load_task is None:
+            self._on_load_task = asyncio.ensure_future(self.on_load())
 
-            # Create a new bubble for each message
-            new_message = {"role": "assistant", "content": ""}
-
-            # Add metadata if present
-            if "metadata" in msg:
-                new_message["metadata"] = msg["metadata"]
-
-            history.append(new_message)
-
-            # Stream the cleaned content character by character
-            for char in cleaned_content:
-                history[-1]["content"] += char
-                time.sleep(self.streaming_delay)
-                yield history, image_path
-
-            # Final yield to ensure complete state
-            yield history, image_path
-
-    def create_interface(self) -> gr.Blocks:
+    def create_interface(self) -> "gr.Blocks":
         """Create the Gradio chat interface.
 
+        Gradio is only imported here, so importing the UI module stays cheap.
+
         Returns:
             Gradio Blocks interface
         """
+        import gradio as gr
+
         with gr.Blocks() as demo:
             gr.Markdown("# 💬 Mini Ema Chat")
 
@@ -221,8 +468,8 @@ class ChatUI:
 
             def clear_chat(selected_bot):
                 """Clear chat history and reset bot."""
-                # Call clear method on the selected bot if it exists
-                bot = self.bots.get(selected_bot)
+                # Call clear method on the selected bot if it has been created
+                bot = self._get_bot(selected_bot, create=False)
                 if bot and hasattr(bot, "clear"):
                     bot.clear()
                 # Reset expression to default
@@ -243,13 +490,22 @@ class ChatUI:
             # When bot selector changes, clear the chat
             bot_selector.change(clear_chat, bot_selector, [chatbot, expression_image], queue=False)
 
+            # Run the load hook while the user is still reading the page
+            if self.on_load is not None:
+                demo.load(self._run_on_load, queue=False)
+
+        # Gradio only streams one queued response at a time by default
+        demo.queue(default_concurrency_limit=self.concurrency_limit, max_size=self.queue_max_size)
         return demo
 
     def launch(self, **kwargs):
         """Launch the chat interface.
 
+        The interface is built on the first launch and reused by later ones.
+
         Args:
             **kwargs: Additional arguments to pass to demo.launch()
         """
-        demo = self.create_interface()
-        demo.launch(**kwargs)
+        if self._demo is None:
+            self._demo = self.create_interface()
+        self._demo.launch(**kwargs)
@@ -6,13 +6,17 @@ based on the original Ema avatar image. It creates variations with different exp
 and actions for use in the chat interface.
 """
 
+import io
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Literal
 
 from dotenv import load_dotenv
 from google import genai
+from google.genai import types
 from PIL import Image
 
 
@@ -24,6 +28,35 @@ Action = Literal["none", "nod", "shake", "wave", "jump", "point"]
 EXPRESSIONS: list[Expression] = ["neutral", "smile", "serious", "confused", "surprised", "sad"]
 ACTIONS: list[Action] = ["none", "nod", "shake", "wave", "jump", "point"]
 
+# Rate limited (429) and server error (5xx) requests are retried with exponential backoff and jitter
+RETRY_OPTIONS = types.HttpRetryOptions(attempts=5, initial_delay=2.0, max_delay=60.0)
+
+# Number of times a response without candidates is requested again before giving up
+EMPTY_RESPONSE_ATTEMPTS = 3
+
+# Larger base images are downscaled to fit this size before uploading
+MAX_BASE_IMAGE_SIZE = 1024
+
+# Default number of images generated concurrently (each one is a slow, I/O-bound API call),
+# overridden by the IMAGE_GEN_WORKERS env var
+MAX_WORKERS = 8
+
+# Every JPEG file starts with these bytes
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+# Serializes status output from worker threads so lines do not interleave
+PRINT_LOCK = threading.Lock()
+
+
+def log(message: str) -> None:
+    """Print a status line from any thread.
+
+    Args:
+        message: The line to print
+    """
+    with PRINT_LOCK:
+        print(message, flush=True)
+
 
 def load_api_key() -> str:
     """Load Gemini API key from environment.
@@ -47,9 +80,44 @@ def load_api_key() -> str:
     return api_key
 
 
+def load_base_image(path: Path) -> str | io.BytesIO:
+    """Load the base image for uploading, downscaling it if it is larger than needed.
+
+    Args:
+        path: Path to the base image
+
+    Returns:
+        The path itself if the image is small enough, otherwise the downscaled PNG data
+    """
+    with Image.open(path) as image:
+        if max(image.size) <= MAX_BASE_IMAGE_SIZE:
+            return str(path)
+        image.thumbnail((MAX_BASE_IMAGE_SIZE, MAX_BASE_IMAGE_SIZE), Image.LANCZOS)
+        data = io.BytesIO()
+        image.save(data, "PNG", optimize=True)
+    data.seek(0)
+    return data
+
+
+def is_generated(path: Path) -> bool:
+    """Check whether a complete image was already generated at a path.
+
+    Args:
+        path: Path of the generated image
+
+    Returns:
+        True if the file exists and starts like a JPEG image, False otherwise
+    """
+    try:
+        with path.open("rb") as f:
+            return f.read(len(JPEG_MAGIC)) == JPEG_MAGIC
+    except OSError:
+        return False
+
+
 def generate_character_image(
     client: genai.Client,
-    base_image: Image.Image,
+    base_image: types.File,
     expression: Expression,
     action: Action,
     output_path: Path,
@@ -58,7 +126,7 @@ def generate_character_image(
 
     Args:
         client: Gemini API client
-        base_image: Base character image (Ema avatar)
+        base_image: Uploaded base character image (Ema avatar)
         expression: Facial expression to generate
         action: Physical action to generate
         output_path: Path to save the generated image
@@ -93,18 +161,16 @@ Keep the character's appearance and style exactly the same, only change the faci
 Make it a clean, professional anime-style portrait suitable for a chat interface avatar.
 The character should be looking at the viewer."""
 
+    label = f"{expression} + {action}"
     try:
-        print(f"  Generating {expression} + {action}...", end=" ", flush=True)
-
-        # Create chat session for image editing
-        chat = client.chats.create(model="gemini-2.5-flash-image")
-
-        # Send the image and prompt
-        response = chat.send_message([prompt, base_image])
-
-        # Check if response has candidates
-        if not response.candidates:
-            print("✗ (no candidates in response)")
+        # Send the prompt with a reference to the uploaded image, as a single-turn edit request.
+        # An empty response is transient, so ask again before giving up
+        for _ in range(EMPTY_RESPONSE_ATTEMPTS):
+            response = client.models.generate_content(model="gemini-2.5-flash-image", contents=[prompt, base_image])
+            if response.candidates:
+                break
+        else:
+            log(f"  {label}: ✗ (no candidates in response)")
             return False
 
         # Save the generated image as JPG with 80% quality
@@ -119,16 +185,19 @@ The character should be looking at the viewer."""
                     rgb_image.paste(image, mask=image.split()[-1] if image.mode in ("RGBA", "LA") else None)
                     image = rgb_image
 
-                # Save as JPG with 80% quality
-                image.save(output_path, "JPEG", quality=80)
-                print("✓")
+                # Save as JPG with 80% quality, through a temporary file so an interrupted
+                # run never leaves a partial image that would be skipped on the next run
+                tmp_path = output_path.with_suffix(".tmp")
+                image.save(tmp_path, "JPEG", quality=80)
+                os.replace(tmp_path, output_path)
+                log(f"  {label}: ✓")
                 return True
 
-        print("✗ (no image in response)")
+        log(f"  {label}: ✗ (no image in response)")
         return False
 
     except Exception as e:
-        print(f"✗ (error: {str(e)})")
+        log(f"  {label}: ✗ (error: {str(e)})")
         return False
 
 
@@ -151,39 +220,56 @@ def main():
     # Load API key and create client
     try:
         api_key = load_api_key()
-        client = genai.Client(api_key=api_key)
+        client = genai.Client(api_key=api_key, http_options=types.HttpOptions(retry_options=RETRY_OPTIONS))
     except ValueError as e:
         print(f"Error: {e}")
         sys.exit(1)
 
-    # Load base image
-    print(f"Loading base image from: {base_image_path}")
-    base_image = Image.open(base_image_path)
+    # Read the worker count and FORCE_REGEN only now, so values set in .env apply.
+    # Set FORCE_REGEN=1 to regenerate images that already exist
+    max_workers = max(1, int(os.getenv("IMAGE_GEN_WORKERS", MAX_WORKERS)))
+    force_regen = os.getenv("FORCE_REGEN") == "1"
+
+    # Upload the base image once, so every request only references it instead of re-sending it
+    print(f"Uploading base image from: {base_image_path}")
+    try:
+        base_image = client.files.upload(
+            file=load_base_image(base_image_path), config=types.UploadFileConfig(mime_type="image/png")
+        )
+    except Exception as e:
+        print(f"Error: Failed to upload base image: {e}")
+        sys.exit(1)
 
-    # Generate all combinations
-    print(f"\nGenerating {len(EXPRESSIONS) * len(ACTIONS)} character variations...")
+    # Generate all combinations, with filenames like expression_action.jpg
+    tasks = [
+        (expression, action, output_dir / f"{expression}_{action}.jpg")
+        for expression in EXPRESSIONS
+        for action in ACTIONS
+    ]
+
+    # Skip images generated by a previous run, unless regeneration is forced
+    existing = 0
+    if not force_regen:
+        remaining = [task for task in tasks if not is_generated(task[2])]
+        existing = len(tasks) - len(remaining)
+        tasks = remaining
+        if existing:
+            print(f"Skipping {existing} existing images (set FORCE_REGEN=1 to regenerate them)")
+
+    print(f"\nGenerating {len(tasks)} character variations with {max_workers} workers...")
     print("=" * 60)
 
-    successful = 0
+    successful = existing
     failed = 0
 
-    for expression in EXPRESSIONS:
-        print(f"\n{expression.upper()}:")
-        for action in ACTIONS:
-            # Create filename: expression_action.jpg
-            filename = f"{expression}_{action}.jpg"
-            output_path = output_dir / filename
-
-            # Generate the image
-            success = generate_character_image(
-                client=client,
-                base_image=base_image,
-                expression=expression,
-                action=action,
-                output_path=output_path,
-            )
-
-            if success:
+    # The API calls are I/O-bound, so run them concurrently in a thread pool
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(generate_character_image, client, base_image, expression, action, output_path)
+            for expression, action, output_path in tasks
+        ]
+        for future in as_completed(futures):
+            if future.result():
                 successful += 1
             else:
                 failed += 1
@@ -0,0 +1,425 @@
+"""Unit tests for BareGeminiBot response handling."""
+
+import asyncio
+import gzip
+import importlib.util
+import os
+from types import SimpleNamespace
+
+import httpx
+from google.genai import types
+
+from mini_ema.bot import BareGeminiBot, LLMCache, SemanticCache
+from mini_ema.bot.bare_gemini_bot import _CLIENTS, _gzip_request, _GzipTransport, _http_options
+
+
+def _chunk(text, finish_reason=None, usage_metadata=None):
+    """Build a fake streamed response chunk."""
+    return SimpleNamespace(
+        text=text,
+        candidates=[SimpleNamespace(finish_reason=finish_reason)],
+        usage_metadata=usage_metadata,
+        model_version="gemini-test",
+    )
+
+
+class FakeChat:
+    """Chat session that streams a fixed list of chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.messages = []
+
+    def send_message_stream(self, message, config=None):
+        self.messages.append(message)
+        yield from self.chunks
+
+    def record_history(self, user_input, model_output, is_valid):
+        self.recorded = (user_input, model_output, is_valid)
+
+    def get_history(self, curated=False):
+        return []
+
+
+def _make_bot(chunks):
+    """Create a bot whose chat session is replaced with a fake one."""
+    bot = BareGeminiBot(api_key="test-key")
+    bot.chat = FakeChat(chunks)
+    return bot
+
+
+def test_get_response_streams_partial_messages():
+    """Test that streamed chunks are yielded as cumulative pending messages."""
+    usage = SimpleNamespace(
+        prompt_token_count=5,
+        candidates_token_count=3,
+        thoughts_token_count=None,
+        total_token_count=8,
+        cached_content_token_count=None,
+    )
+    stop = SimpleNamespace(value="STOP")
+    bot = _make_bot([_chunk("Hello"), _chunk(" there"), _chunk("!", stop, usage)])
+    bot.stream_flush_interval = 0
+
+    messages = list(bot.get_response("hi"))
+
+    assert [m["content"] for m in messages] == ["Hello", "Hello there", "Hello there!", "Hello there!"]
+    assert all(m["pending"] for m in messages[:-1])
+    assert "pending" not in messages[-1]
+    assert "status" not in messages[-1]["metadata"]
+    assert messages[-1]["metadata"]["log"] == (
+        "Model: gemini-test | Finish: Stop | Prompt: 5 | Response: 3 | Total: 8"
+    )
+    assert bot.chat.messages == ["hi"]
+
+
+def test_get_response_uses_finishing_chunk_for_log():
+    """Test that the usage log comes from the chunk with the finish reason, not a trailing one."""
+    usage = SimpleNamespace(
+        prompt_token_count=5,
+        candidates_token_count=2,
+        thoughts_token_count=None,
+        total_token_count=7,
+        cached_content_token_count=None,
+    )
+    trailing = SimpleNamespace(text=None, candidates=None, usage_metadata=None, model_version="gemini-test")
+    bot = _make_bot([_chunk("Hi"), _chunk("!", SimpleNamespace(value="STOP"), usage), trailing])
+    bot.stream_flush_interval = 0
+
+    messages = list(bot.get_response("hi"))
+
+    assert [m["content"] for m in messages] == ["Hi", "Hi!", "Hi!"]
+    assert messages[-1]["metadata"]["log"] == "Model: gemini-test | Finish: Stop | Prompt: 5 | Response: 2 | Total: 7"
+
+
+def test_get_response_coalesces_small_chunks():
+    """Test that small chunks are batched until enough characters have accumulated."""
+    stop = SimpleNamespace(value="STOP")
+    bot = _make_bot([_chunk("a"), _chunk("b"), _chunk("c"), _chunk("d"), _chunk("e", stop)])
+    bot.stream_flush_chars = 2
+    bot.stream_flush_interval = 60
+
+    messages = list(bot.get_response("hi"))
+
+    # The first chunk is emitted immediately, then every two characters, then the final message
+    assert [m["content"] for m in messages] == ["a", "abc", "abcde", "abcde"]
+
+
+def test_format_usage_log_includes_thoughts():
+    """Test that thought tokens are only reported when present."""
+    bot = BareGeminiBot(api_key="test-key")
+    usage = SimpleNamespace(
+        prompt_token_count=5,
+        candidates_token_count=3,
+        thoughts_token_count=4,
+        total_token_count=12,
+        cached_content_token_count=None,
+    )
+
+    assert bot._format_usage_log("Stop", usage, "gemini-test") == (
+        "Model: gemini-test | Finish: Stop | Prompt: 5 | Response: 3 | Thoughts: 4 | Total: 12"
+    )
+    assert bot._format_usage_log("Stop", None, "gemini-test") == "Model: gemini-test | Finish: Stop"
+
+
+def test_get_response_reports_cached_tokens():
+    """Test that prompt tokens served from Gemini's context cache are reported in the log."""
+    usage = SimpleNamespace(
+        prompt_token_count=50,
+        candidates_token_count=3,
+        thoughts_token_count=None,
+        total_token_count=53,
+        cached_content_token_count=40,
+    )
+    bot = _make_bot([_chunk("Hi!", SimpleNamespace(value="STOP"), usage)])
+
+    final = list(bot.get_response("hi"))[-1]
+
+    assert final["metadata"]["log"] == (
+        "Model: gemini-test | Finish: Stop | Prompt: 50 | Cached: 40 | Response: 3 | Total: 53"
+    )
+    assert set(final["metadata"]) == {"title", "log"}
+
+
+def test_get_response_reports_errors():
+    """Test that an exception during streaming is turned into an error message."""
+    bot = _make_bot([])
+
+    messages = list(bot.get_response("hi"))
+
+    assert len(messages) == 1
+    assert messages[0]["metadata"]["title"] == "❌ Error"
+
+
+def test_get_response_uses_semantic_cache():
+    """Test that a near-duplicate message is answered from the semantic cache."""
+    stop = SimpleNamespace(value="STOP")
+    bot = _make_bot([_chunk("Hi!", stop)])
+    bot.semantic_cache = SemanticCache(threshold=0.9)
+    embeddings = {"hello": [1.0, 0.0], "hello!": [0.99, 0.05]}
+    bot.client = SimpleNamespace(
+        models=SimpleNamespace(
+            embed_content=lambda model, contents: SimpleNamespace(
+                embeddings=[SimpleNamespace(values=embeddings[contents])]
+            )
+        )
+    )
+
+    first = list(bot.get_response("hello"))
+    second = list(bot.get_response("hello!"))
+
+    assert first[-1]["content"] == "Hi!"
+    assert len(second) == 1
+    assert second[0]["content"] == "Hi!"
+    assert second[0]["metadata"]["log"].startswith("Semantic cache hit")
+    # Only the first message reached the model, the cached one was recorded into history
+    assert bot.chat.messages == ["hello"]
+    assert bot.chat.recorded[0].parts[0].text == "hello!"
+
+
+def test_get_response_uses_response_cache():
+    """Test that an exactly repeated request is answered from the response cache."""
+    stop = SimpleNamespace(value="STOP")
+    bot = _make_bot([_chunk("Hi!", stop)])
+    bot.response_cache = LLMCache()
+
+    first = list(bot.get_response("hello"))
+    second = list(bot.get_response("hello"))
+
+    assert first[-1]["content"] == "Hi!"
+    assert len(second) == 1
+    assert second[0]["content"] == "Hi!"
+    assert second[0]["metadata"]["log"] == "Response cache hit"
+    assert bot.chat.messages == ["hello"]
+
+
+def test_bots_share_client_per_api_key():
+    """Test that bots with the same API key reuse one Gemini client."""
+    first = BareGeminiBot(api_key="shared-key")
+    second = BareGeminiBot(api_key="shared-key")
+    other = BareGeminiBot(api_key="other-key")
+
+    assert first.client is second.client
+    assert first.client is not other.client
+
+
+def test_http_options_from_env():
+    """Test that the request timeout and retries are read from the environment."""
+    os.environ["GEMINI_REQUEST_TIMEOUT"] = "2.5"
+    os.environ["GEMINI_REQUEST_RETRIES"] = "1"
+    try:
+        options = _http_options()
+    finally:
+        del os.environ["GEMINI_REQUEST_TIMEOUT"]
+        del os.environ["GEMINI_REQUEST_RETRIES"]
+
+    assert options.timeout == 2500
+    assert options.retry_options.attempts == 2
+    assert _http_options().timeout is None
+
+
+def test_request_compression():
+    """Test that only large request bodies are gzipped, and only when enabled."""
+    url = "https://example.com/v1beta/models/gemini-test:generateContent"
+    small = httpx.Request("POST", url, content=b"{}")
+    large = httpx.Request("POST", url, content=b'{"text": "hello"}' * 100)
+
+    assert _gzip_request(small) is small
+    compressed = _gzip_request(large)
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Content-Length"] == str(len(compressed.content))
+    assert gzip.decompress(compressed.content) == large.content
+
+    assert _http_options().client_args is None
+    os.environ["GEMINI_REQUEST_COMPRESSION"] = "1"
+    try:
+        options = _http_options()
+    finally:
+        del os.environ["GEMINI_REQUEST_COMPRESSION"]
+    assert isinstance(options.client_args["transport"], _GzipTransport)
+    # The custom transport keeps the SSL context the SDK would have used
+    assert options.client_args["transport"]._pool._ssl_context is options.client_args["verify"]
+
+
+def test_http2_requires_h2():
+    """Test that enabling HTTP/2 fails early when the h2 package is missing."""
+    os.environ["GEMINI_HTTP2"] = "1"
+    try:
+        if importlib.util.find_spec("h2") is None:
+            try:
+                _http_options()
+            except ImportError as e:
+                assert "httpx[http2]" in str(e)
+            else:
+                raise AssertionError("Expected ImportError without h2")
+        else:
+            assert _http_options().client_args["transport"] is not None
+    finally:
+        del os.environ["GEMINI_HTTP2"]
+
+
+def test_aget_response_matches_sync_path():
+    """Test that the async path streams the same messages and records the turn in the main chat."""
+    stop = SimpleNamespace(value="STOP")
+    chunks = [_chunk("Hello "), _chunk("world", stop)]
+
+    class FakeAsyncChat:
+        def __init__(self):
+            self.history = []
+
+        async def send_message_stream(self, message):
+            async def stream():
+                for chunk in chunks:
+                    yield chunk
+                self.history = ["user", "model"]
+
+            return stream()
+
+        def get_history(self, curated=False):
+            return self.history
+
+    bot = _make_bot(chunks)
+    bot.client = SimpleNamespace(aio=SimpleNamespace(chats=SimpleNamespace(create=lambda **kwargs: FakeAsyncChat())))
+
+    async def collect():
+        return [msg async for msg in bot.aget_response("hi")]
+
+    assert asyncio.run(collect()) == list(_make_bot(chunks).get_response("hi"))
+    assert bot.chat.recorded == ("user", ["model"], True)
+
+
+def test_get_responses_batch():
+    """Test that batch results are polled for and returned in input order, each with its own errors."""
+    stop = SimpleNamespace(value="STOP")
+    jobs = [
+        SimpleNamespace(name="batches/1", state=types.JobState.JOB_STATE_RUNNING),
+        SimpleNamespace(
+            name="batches/1",
+            state=types.JobState.JOB_STATE_SUCCEEDED,
+            dest=SimpleNamespace(
+                inlined_responses=[
+                    SimpleNamespace(response=_chunk("One", stop), error=None),
+                    SimpleNamespace(response=None, error=SimpleNamespace(code=400, message="Bad request")),
+                    # Blocked prompts come back without candidates
+                    SimpleNamespace(
+                        response=SimpleNamespace(text=None, candidates=None, usage_metadata=None, model_version="m"),
+                        error=None,
+                    ),
+                ]
+            ),
+        ),
+    ]
+    bot = BareGeminiBot(api_key="test-key")
+    bot.client = SimpleNamespace(batches=SimpleNamespace(create=lambda model, src: jobs[0], get=lambda name: jobs[1]))
+
+    results = bot.get_responses_batch(["first", "second", "blocked"], poll_interval=0)
+
+    assert results[0]["content"] == "One"
+    assert results[0]["metadata"]["log"].startswith("Model: gemini-test")
+    assert results[1]["metadata"]["title"] == "❌ API Error"
+    assert results[2]["metadata"]["title"] == "❌ Error"
+
+
+def test_get_responses_batch_errors_are_separate():
+    """Test that a failed batch job returns a separate error message for every input."""
+
+    def create(model, src):
+        raise RuntimeError("quota exceeded")
+
+    bot = BareGeminiBot(api_key="test-key")
+    bot.client = SimpleNamespace(batches=SimpleNamespace(create=create))
+
+    results = bot.get_responses_batch(["first", "second"], poll_interval=0)
+
+    assert [r["content"] for r in results] == ["Unexpected error: quota exceeded"] * 2
+    assert results[0] is not results[1]
+
+
+def test_aget_responses_runs_concurrently():
+    """Test that independent messages are answered concurrently and returned in input order."""
+    stop = SimpleNamespace(value="STOP")
+    in_flight = []
+
+    async def generate_content(model, contents, config):
+        in_flight.append(contents)
+        await asyncio.sleep(0)
+        # Every request has been sent before the first one completes
+        assert len(in_flight) == 3
+        if contents == "boom":
+            raise RuntimeError("boom")
+        return _chunk(contents.upper(), stop)
+
+    bot = BareGeminiBot(api_key="test-key")
+    bot.client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+
+    results = asyncio.run(bot.aget_responses(["one", "boom", "two"]))
+
+    assert [r["content"] for r in results[::2]] == ["ONE", "TWO"]
+    assert results[1]["metadata"]["title"] == "❌ Error"
+
+
+def test_system_instruction_in_config_and_cache_key():
+    """Test that the system instruction is pinned in the chat config and part of the cache key."""
+    bot = BareGeminiBot(api_key="test-key", system_instruction="Be brief.")
+    bot.chat = FakeChat([])
+    plain = BareGeminiBot(api_key="test-key")
+    plain.chat = FakeChat([])
+
+    assert bot._chat_config.system_instruction == "Be brief."
+    assert bot._cache_key("hi") != plain._cache_key("hi")
+
+
+def test_warm_up_pings_shared_async_client():
+    """Test that warming up sends a listing request through the shared client's async interface."""
+    calls = []
+
+    async def list_models(config):
+        calls.append(config)
+
+    _CLIENTS["warm-key"] = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(list=list_models)))
+    try:
+        asyncio.run(BareGeminiBot.warm_up("warm-key"))
+    finally:
+        del _CLIENTS["warm-key"]
+
+    assert calls == [{"page_size": 1}]
+
+
+def test_thinking_level_resolution():
+    """Test that thinking levels are case-insensitive and fall back to MINIMAL."""
+    assert BareGeminiBot(api_key="test-key", thinking_level="high").thinking_level == types.ThinkingLevel.HIGH
+    assert BareGeminiBot(api_key="test-key", thinking_level="bogus").thinking_level == types.ThinkingLevel.MINIMAL
+
+
+def test_thinking_budget_replaces_level():
+    """Test that a thinking budget is sent instead of the thinking level and is part of the cache key."""
+    bot = BareGeminiBot(api_key="test-key", thinking_budget=0)
+    assert bot._chat_config.thinking_config.thinking_budget == 0
+    assert bot._chat_config.thinking_config.thinking_level is None
+    assert BareGeminiBot(api_key="test-key")._chat_config.thinking_config.thinking_budget is None
+    assert bot._cache_key("hi") != BareGeminiBot(api_key="test-key")._cache_key("hi")
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_get_response_streams_partial_messages()
+    test_get_response_uses_finishing_chunk_for_log()
+    test_get_response_coalesces_small_chunks()
+    test_format_usage_log_includes_thoughts()
+    test_get_response_reports_cached_tokens()
+    test_get_response_reports_errors()
+    test_get_response_uses_semantic_cache()
+    test_get_response_uses_response_cache()
+    test_bots_share_client_per_api_key()
+    test_http_options_from_env()
+    test_request_compression()
+    test_http2_requires_h2()
+    test_aget_response_matches_sync_path()
+    test_get_responses_batch()
+    test_get_responses_batch_errors_are_separate()
+    test_aget_responses_runs_concurrently()
+    test_system_instruction_in_config_and_cache_key()
+    test_warm_up_pings_shared_async_client()
+    test_thinking_level_resolution()
+    test_thinking_budget_replaces_level()
+    print("All tests passed!")
@@ -0,0 +1,21 @@
+"""Unit tests for the BaseBot interface."""
+
+import asyncio
+
+from mini_ema.bot import SimpleBot
+
+
+def test_aget_response_matches_get_response():
+    """Test that the default async implementation yields the same messages as the sync one."""
+    bot = SimpleBot()
+
+    async def collect():
+        return [msg async for msg in bot.aget_response("hello", "Phoenix")]
+
+    assert asyncio.run(collect()) == list(bot.get_response("hello", "Phoenix"))
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_aget_response_matches_get_response()
+    print("All tests passed!")
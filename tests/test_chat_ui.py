@@ -0,0 +1,309 @@
+"""Unit tests for ChatUI streaming logic."""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import gradio as gr
+
+from mini_ema.bot import BaseBot, SimpleBot
+from mini_ema.ui import CONCURRENCY_LIMIT, EMA_AVATAR, QUEUE_MAX_SIZE, STREAMING_DELAY, ChatUI
+from mini_ema.ui.chat_ui import _expression_image_path, _parse_final_tags
+
+
+class StreamingBot(BaseBot):
+    """Bot that streams a single answer through pending messages."""
+
+    def clear(self):
+        """Clear conversation history (no-op)."""
+        pass
+
+    def get_response(self, message, username="Phoenix"):
+        """Yield cumulative pending messages followed by the final one."""
+        yield {"role": "assistant", "content": "Hel", "metadata": {"title": "💡 Answer"}, "pending": True}
+        yield {"role": "assistant", "content": "Hello wor", "metadata": {"title": "💡 Answer"}, "pending": True}
+        yield {"role": "assistant", "content": "Hello world", "metadata": {"title": "💡 Answer", "log": "Done"}}
+
+
+def _run_bot_response(chat_ui, message="hello", bot_name="Simple Bot"):
+    """Run a full bot response and snapshot every yielded frame."""
+    history = [{"role": "user", "content": message}]
+
+    async def run():
+        return [
+            ([dict(m) for m in h], image) async for h, image in chat_ui._bot_response(history, bot_name, "Phoenix")
+        ]
+
+    return history, asyncio.run(run())
+
+
+def test_bot_response_final_content():
+    """Test that the streamed bubbles end up with the full cleaned content."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()}, streaming_delay=0)
+    history, frames = _run_bot_response(chat_ui)
+
+    assert len(history) == 3
+    assert history[1]["content"] == "你好，我是Ema。"
+    assert history[2]["content"] == "请问有什么可以帮助你的吗？"
+    assert history[1]["metadata"]["title"] == "💡 Answer"
+    assert frames
+
+
+def test_bot_response_throttles_yields():
+    """Test that UI updates are throttled to one per frame rather than one per character."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()}, streaming_delay=0, frame_interval=60)
+    _, frames = _run_bot_response(chat_ui)
+
+    # Only the final flush for each of the two messages is yielded
+    assert len(frames) == 2
+
+
+def test_bot_response_chunked_streaming():
+    """Test that content is typed out in chunks of chunk_size characters when a delay is set."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()}, streaming_delay=0.0001, frame_interval=0, chunk_size=4)
+    _, frames = _run_bot_response(chat_ui)
+    contents = [h[-1]["content"] for h, _ in frames]
+
+    # "你好，我是Ema。" has 9 characters: chunks of 4, 4 and 1, without repeating the last frame
+    assert contents[:4] == ["你好，我", "你好，我是Ema", "你好，我是Ema。", "请问有什"]
+
+
+def test_bot_response_passes_messages_through_without_delay():
+    """Test that each message is sent whole when there is no typing delay."""
+    chat_ui = ChatUI({"Streaming Bot": StreamingBot()}, streaming_delay=0, frame_interval=0, chunk_size=1)
+    _, frames = _run_bot_response(chat_ui, bot_name="Streaming Bot")
+
+    assert [h[-1]["content"] for h, _ in frames] == ["Hel", "Hello wor", "Hello world"]
+
+
+def test_bot_response_continues_pending_bubble():
+    """Test that pending messages are streamed into a single bubble."""
+    chat_ui = ChatUI({"Streaming Bot": StreamingBot()}, streaming_delay=0)
+    history, _ = _run_bot_response(chat_ui, bot_name="Streaming Bot")
+
+    assert len(history) == 2
+    assert history[1]["content"] == "Hello world"
+    # Gradio collapses bubbles whose status is "done", so the final answer carries no status
+    assert history[1]["metadata"] == {"title": "💡 Answer", "log": "Done"}
+    assert "pending" not in history[1]
+
+
+def test_bot_response_sends_image_only_when_changed():
+    """Test that the expression image is sent once and skipped while it stays the same."""
+    chat_ui = ChatUI({"Streaming Bot": StreamingBot()}, streaming_delay=0, frame_interval=0)
+    _, frames = _run_bot_response(chat_ui, bot_name="Streaming Bot")
+    images = [image for _, image in frames]
+
+    assert isinstance(images[0], str)
+    assert len(images) > 1
+    assert all(image == gr.skip() for image in images[1:])
+
+
+def test_history_is_updated_in_place():
+    """Test that the user message and every streaming update reuse the same history list."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()}, streaming_delay=0, frame_interval=0)
+    history = []
+    _, updated = chat_ui._user_message("hello", history)
+    assert updated is history
+
+    async def run():
+        return [h async for h, _ in chat_ui._bot_response(history, "Simple Bot", "Phoenix")]
+
+    assert all(h is history for h in asyncio.run(run()))
+
+
+def test_bot_factory_created_on_first_use():
+    """Test that bots given as factories are only created when first used."""
+    created = []
+
+    def factory():
+        created.append(True)
+        return SimpleBot()
+
+    chat_ui = ChatUI({"Simple Bot": SimpleBot(), "Lazy Bot": factory}, streaming_delay=0)
+    assert created == []
+    assert chat_ui._get_bot("Lazy Bot", create=False) is None
+
+    _run_bot_response(chat_ui, bot_name="Lazy Bot")
+    _run_bot_response(chat_ui, bot_name="Lazy Bot")
+
+    assert created == [True]
+    assert isinstance(chat_ui.bots["Lazy Bot"], SimpleBot)
+
+
+def test_streaming_delay_read_from_env_on_init():
+    """Test that the streaming delay is read when the UI is created, after .env has been loaded."""
+    os.environ["STREAMING_DELAY"] = "0.02"
+    try:
+        chat_ui = ChatUI({"Simple Bot": SimpleBot()})
+    finally:
+        del os.environ["STREAMING_DELAY"]
+
+    assert chat_ui.streaming_delay == 0.02
+    assert ChatUI({"Simple Bot": SimpleBot()}).streaming_delay == STREAMING_DELAY
+    assert ChatUI({"Simple Bot": SimpleBot()}, streaming_delay=0.5).streaming_delay == 0.5
+
+
+def test_bot_factory_errors_are_shown_in_chat():
+    """Test that a bot that cannot be created is reported in an error bubble instead of raising."""
+
+    def factory():
+        raise ValueError("Gemini API key not provided.")
+
+    chat_ui = ChatUI({"Simple Bot": SimpleBot(), "Broken Bot": factory}, streaming_delay=0)
+
+    for _ in range(2):
+        history, _ = _run_bot_response(chat_ui, bot_name="Broken Bot")
+        assert history[-1]["content"] == "Could not start Broken Bot: Gemini API key not provided."
+        assert history[-1]["metadata"] == {"title": "❌ Error"}
+
+
+def test_create_interface_configures_queue():
+    """Test that the interface streams several responses at once and keeps instant events unqueued."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()}, concurrency_limit=3, queue_max_size=7)
+    demo = chat_ui.create_interface()
+
+    assert demo._queue.default_concurrency_limit == 3
+    assert demo._queue.max_size == 7
+    queued = {fn.name: fn.queue for fn in demo.fns.values()}
+    assert queued["_bot_response"] is True
+    assert queued["_user_message"] is False
+    assert queued["clear_chat"] is False
+
+
+def test_queue_settings_read_from_env_on_init():
+    """Test that the queue settings are read when the UI is created, after .env has been loaded."""
+    os.environ["CONCURRENCY_LIMIT"] = "3"
+    os.environ["QUEUE_MAX_SIZE"] = "7"
+    try:
+        chat_ui = ChatUI({"Simple Bot": SimpleBot()})
+    finally:
+        del os.environ["CONCURRENCY_LIMIT"]
+        del os.environ["QUEUE_MAX_SIZE"]
+
+    assert chat_ui.concurrency_limit == 3
+    assert chat_ui.queue_max_size == 7
+    default = ChatUI({"Simple Bot": SimpleBot()})
+    assert (default.concurrency_limit, default.queue_max_size) == (CONCURRENCY_LIMIT, QUEUE_MAX_SIZE)
+
+
+def test_create_interface_runs_load_hook_once():
+    """Test that the load hook is an unqueued page load event that only runs on the first load."""
+    calls = []
+
+    async def on_load():
+        calls.append(True)
+
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()}, on_load=on_load)
+    loads = [fn for fn in chat_ui.create_interface().fns.values() if fn.name == "_run_on_load"]
+    assert len(loads) == 1
+    assert loads[0].queue is False
+
+    async def load_pages():
+        for _ in range(3):
+            await chat_ui._run_on_load()
+        await chat_ui._on_load_task
+
+    asyncio.run(load_pages())
+    assert calls == [True]
+
+    default = ChatUI({"Simple Bot": SimpleBot()}).create_interface()
+    assert all(fn.name != "_run_on_load" for fn in default.fns.values())
+
+
+def test_launch_reuses_interface():
+    """Test that repeated launches build the interface only once."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()})
+    launches = []
+    built = []
+
+    def create_interface():
+        built.append(True)
+        return SimpleNamespace(launch=lambda **kwargs: launches.append(kwargs))
+
+    chat_ui.create_interface = create_interface
+    chat_ui.launch(share=False)
+    chat_ui.launch(server_port=7861)
+
+    assert built == [True]
+    assert launches == [{"share": False}, {"server_port": 7861}]
+
+
+def test_parse_expression_and_action():
+    """Test parsing and stripping of expression/action tags."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()})
+    expression, action, cleaned = chat_ui._parse_expression_and_action("[Expression: Smile] [Action: wave]\n\nHi!")
+
+    assert expression == "smile"
+    assert action == "wave"
+    assert cleaned == "Hi!"
+
+
+def test_parse_expression_and_action_defaults():
+    """Test default expression and action when no tags are present."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()})
+    expression, action, cleaned = chat_ui._parse_expression_and_action("Just text")
+
+    assert expression == "neutral"
+    assert action == "none"
+    assert cleaned == "Just text"
+
+
+def test_parse_expression_and_action_ignores_malformed_tags():
+    """Test that malformed or unknown tags are left in the content."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()})
+    content = "[Note: keep] [Expression: sad face] [action:  nod] [Expression: smile] [Action: wave"
+    expression, action, cleaned = chat_ui._parse_expression_and_action(content)
+
+    assert expression == "smile"
+    assert action == "nod"
+    assert cleaned == "[Note: keep] [Expression: sad face]   [Action: wave"
+
+
+def test_parse_expression_and_action_is_memoized():
+    """Test that parsing the same final content twice reuses the cached result, and partial content is not cached."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()})
+    content = "[Expression: happy] Memoized!"
+    first = chat_ui._parse_expression_and_action(content)
+    hits = _parse_final_tags.cache_info().hits
+
+    assert chat_ui._parse_expression_and_action(content) is first
+    assert _parse_final_tags.cache_info().hits == hits + 1
+
+    size = _parse_final_tags.cache_info().currsize
+    assert chat_ui._parse_expression_and_action("[Expression: happy] Stream", final=False)[0] == "happy"
+    assert _parse_final_tags.cache_info().currsize == size
+
+
+def test_expression_image_path_falls_back_to_avatar():
+    """Test that unknown expressions resolve to the default avatar, once per pair."""
+    chat_ui = ChatUI({"Simple Bot": SimpleBot()})
+    misses = _expression_image_path.cache_info().misses
+
+    assert chat_ui._get_expression_image_path("no_such", "expression") == EMA_AVATAR
+    assert chat_ui._get_expression_image_path("no_such", "expression") == EMA_AVATAR
+    assert _expression_image_path.cache_info().misses == misses + 1
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_bot_response_final_content()
+    test_bot_response_throttles_yields()
+    test_bot_response_chunked_streaming()
+    test_bot_response_passes_messages_through_without_delay()
+    test_bot_response_continues_pending_bubble()
+    test_bot_response_sends_image_only_when_changed()
+    test_history_is_updated_in_place()
+    test_bot_factory_created_on_first_use()
+    test_bot_factory_errors_are_shown_in_chat()
+    test_streaming_delay_read_from_env_on_init()
+    test_create_interface_configures_queue()
+    test_queue_settings_read_from_env_on_init()
+    test_create_interface_runs_load_hook_once()
+    test_launch_reuses_interface()
+    test_parse_expression_and_action()
+    test_parse_expression_and_action_defaults()
+    test_parse_expression_and_action_ignores_malformed_tags()
+    test_parse_expression_and_action_is_memoized()
+    test_expression_image_path_falls_back_to_avatar()
+    print("All tests passed!")
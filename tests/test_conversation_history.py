@@ -2,35 +2,43 @@
 
 import os
 import threading
-import time
 
 from mini_ema.bot.pretty_gemini_bot import ConversationHistory
 
 
+def _make_history(max_rounds):
+    """Create a ConversationHistory for max_rounds without leaking the env var to other tests."""
+    previous = os.environ.get("PRETTY_GEMINI_BOT_HISTORY_LENGTH")
+    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = str(max_rounds)
+    try:
+        return ConversationHistory()
+    finally:
+        if previous is None:
+            del os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"]
+        else:
+            os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = previous
+
+
 def test_initialization():
     """Test basic initialization of ConversationHistory."""
-    # Set env var for testing
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "5"
-    history = ConversationHistory()
+    history = _make_history(5)
     assert history._max_capacity == 10  # 5 rounds * 2 messages per round
-    assert len(history._history) == 0
+    assert len(history._snapshot) == 0
     assert history.get_recent_messages() == []
 
 
 def test_add_messages():
     """Test adding messages to history."""
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "5"
-    history = ConversationHistory()
+    history = _make_history(5)
     messages = ["user message", "assistant response"]
     history.add_messages(messages)
-    assert len(history._history) == 2
+    assert len(history._snapshot) == 2
     assert history.get_recent_messages() == messages
 
 
 def test_get_recent_messages_basic():
     """Test getting recent messages with basic scenarios."""
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "3"
-    history = ConversationHistory()
+    history = _make_history(3)
 
     # Add 2 rounds (4 messages)
     history.add_messages(["user1", "assistant1"])
@@ -41,124 +49,149 @@ def test_get_recent_messages_basic():
     assert recent == ["user1", "assistant1", "user2", "assistant2"]
 
 
+def test_get_snapshot_is_not_copied():
+    """Test that the snapshot is shared until the next write and unaffected by it."""
+    history = _make_history(3)
+    history.add_messages(["user1", "assistant1"])
+
+    snapshot = history.get_snapshot()
+    assert history.get_snapshot() is snapshot
+
+    history.add_messages(["user2", "assistant2"])
+    assert snapshot == ("user1", "assistant1")
+    assert history.get_snapshot() == ("user1", "assistant1", "user2", "assistant2")
+
+
 def test_automatic_trimming():
-    """Test that history automatically trims to max_capacity."""
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "2"
-    history = ConversationHistory()  # max_capacity = 4
+    """Test that history trims back to max_capacity once it exceeds twice that size."""
+    history = _make_history(2)  # max_capacity = 4
 
-    # Add 4 rounds (8 messages)
+    # Add 5 rounds (10 messages)
     history.add_messages(["user1", "assistant1"])
     history.add_messages(["user2", "assistant2"])
     history.add_messages(["user3", "assistant3"])
     history.add_messages(["user4", "assistant4"])
+    history.add_messages(["user5", "assistant5"])
 
-    # Should only keep last 2 rounds (4 messages)
+    # Exceeding 2 * max_capacity resets to the last 2 rounds (4 messages)
     recent = history.get_recent_messages()
-    assert recent == ["user3", "assistant3", "user4", "assistant4"]
+    assert recent == ["user4", "assistant4", "user5", "assistant5"]
     assert len(recent) == 4
 
 
 def test_automatic_trimming_on_add():
-    """Test that history is automatically trimmed when adding messages."""
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "2"
-    history = ConversationHistory()  # max_capacity = 4
+    """Test that history grows append-only and is trimmed when adding past the window."""
+    history = _make_history(2)  # max_capacity = 4
 
     # Add 1 round
     history.add_messages(["user1", "assistant1"])
-    assert len(history._history) == 2
+    assert len(history._snapshot) == 2
 
     # Add 1 more round
     history.add_messages(["user2", "assistant2"])
-    assert len(history._history) == 4
+    assert len(history._snapshot) == 4
 
-    # Add 1 more round - should trim the oldest round
+    # Add 2 more rounds - history keeps growing so the prefix stays stable
     history.add_messages(["user3", "assistant3"])
-    assert len(history._history) == 4  # Should still be 4 (not 6)
-    assert history.get_recent_messages() == ["user2", "assistant2", "user3", "assistant3"]
-
-    # Add another round - should trim again
+    assert len(history._snapshot) == 6
     history.add_messages(["user4", "assistant4"])
-    assert len(history._history) == 4
-    assert history.get_recent_messages() == ["user3", "assistant3", "user4", "assistant4"]
+    assert len(history._snapshot) == 8
+    assert history.get_recent_messages()[:2] == ["user1", "assistant1"]
+
+    # Add another round - exceeds 2 * max_capacity and resets to the last 2 rounds
+    history.add_messages(["user5", "assistant5"])
+    assert len(history._snapshot) == 4
+    assert history.get_recent_messages() == ["user4", "assistant4", "user5", "assistant5"]
+
+    # Add another round - grows again from the new prefix
+    history.add_messages(["user6", "assistant6"])
+    assert len(history._snapshot) == 6
+    assert history.get_recent_messages()[:2] == ["user4", "assistant4"]
 
 
 def test_clear():
     """Test clearing conversation history."""
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "5"
-    history = ConversationHistory()
+    history = _make_history(5)
 
     # Add messages
     history.add_messages(["user1", "assistant1"])
-    assert len(history._history) == 2
+    assert len(history._snapshot) == 2
 
     # Clear history
     history.clear()
-    assert len(history._history) == 0
+    assert len(history._snapshot) == 0
     assert history.get_recent_messages() == []
 
 
 def test_empty_history():
     """Test operations on empty history."""
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "5"
-    history = ConversationHistory()
+    history = _make_history(5)
 
-    assert len(history._history) == 0
+    assert len(history._snapshot) == 0
     assert history.get_recent_messages() == []
 
     # Clear empty history should not raise error
     history.clear()
-    assert len(history._history) == 0
+    assert len(history._snapshot) == 0
 
 
 def test_zero_max_rounds():
-    """Test when max_rounds is 0."""
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "0"
-    history = ConversationHistory()
+    """Test that history is disabled when max_rounds is 0 or negative."""
+    for max_rounds in (0, -5):
+        history = _make_history(max_rounds)
 
-    # max_capacity should be 0
-    assert history._max_capacity == 0
+        # Negative values are clamped, so max_capacity should be 0
+        assert history._max_capacity == 0
 
-    # Add messages
-    history.add_messages(["user1", "assistant1"])
+        # Add messages, which are dropped without replacing the empty snapshot
+        snapshot = history.get_snapshot()
+        history.add_messages(["user1", "assistant1"])
+        assert history.get_snapshot() is snapshot
 
-    # Should return empty list
-    recent = history.get_recent_messages()
-    assert recent == []
-    assert len(history._history) == 0
+        # Should return empty list
+        assert history.get_recent_messages() == []
 
 
 def test_thread_safety():
     """Test thread safety of ConversationHistory operations."""
-    os.environ["PRETTY_GEMINI_BOT_HISTORY_LENGTH"] = "100"
-    history = ConversationHistory()
+    # 20 rounds (40 messages) are kept, so the history is trimmed many times while the threads run
+    history = _make_history(20)
     errors = []
 
-    def add_messages_thread(thread_id, count):
-        """Add messages from a thread."""
+    # All threads start together so reads and writes overlap as much as possible
+    barrier = threading.Barrier(5 + 3)
+
+    def add_messages_thread(thread_id, count, batch_size=10):
+        """Add messages from a thread, several rounds per call."""
         try:
-            for i in range(count):
-                history.add_messages([f"user_{thread_id}_{i}", f"assistant_{thread_id}_{i}"])
+            barrier.wait()
+            for start in range(0, count, batch_size):
+                batch = []
+                for i in range(start, start + batch_size):
+                    batch.extend([f"user_{thread_id}_{i}", f"assistant_{thread_id}_{i}"])
+                history.add_messages(batch)
         except Exception as e:
             errors.append(e)
 
     def read_messages_thread(count):
         """Read messages from a thread."""
         try:
+            barrier.wait()
             for _ in range(count):
-                history.get_recent_messages()
-                time.sleep(0.001)  # Small delay to interleave operations
+                # Readers never see more than twice the capacity, even in the middle of a trim
+                assert len(history.get_recent_messages()) <= 2 * 40
         except Exception as e:
             errors.append(e)
 
     # Create multiple threads that add and read messages concurrently
     threads = []
     for i in range(5):
-        t = threading.Thread(target=add_messages_thread, args=(i, 10))
+        t = threading.Thread(target=add_messages_thread, args=(i, 100))
         threads.append(t)
         t.start()
 
     for _ in range(3):
-        t = threading.Thread(target=read_messages_thread, args=(20,))
+        t = threading.Thread(target=read_messages_thread, args=(200,))
         threads.append(t)
         t.start()
 
@@ -169,8 +202,17 @@ def test_thread_safety():
     # Check no errors occurred
     assert len(errors) == 0
 
-    # Verify we don't have more than max_capacity messages
-    assert len(history._history) <= 200  # 100 rounds * 2 messages
+    # The 1000 messages written were trimmed back within the window
+    snapshot = history.get_snapshot()
+    assert 40 <= len(snapshot) <= 2 * 40
+
+    # Trimming only drops the oldest messages, so every thread's remaining rounds are its
+    # latest ones, in order, with each user message followed by its answer
+    for thread_id in range(5):
+        own = [i for i, m in enumerate(snapshot) if m.startswith(f"user_{thread_id}_")]
+        rounds = [int(snapshot[i].rsplit("_", 1)[1]) for i in own]
+        assert rounds == list(range(100 - len(rounds), 100))
+        assert all(snapshot[i + 1] == f"assistant_{thread_id}_{r}" for i, r in zip(own, rounds, strict=True))
 
 
 if __name__ == "__main__":
@@ -178,6 +220,7 @@ if __name__ == "__main__":
     test_initialization()
     test_add_messages()
     test_get_recent_messages_basic()
+    test_get_snapshot_is_not_copied()
     test_automatic_trimming()
     test_automatic_trimming_on_add()
     test_clear()
@@ -0,0 +1,72 @@
+"""Unit tests for LLMCache class."""
+
+import time
+
+from mini_ema.bot import LLMCache
+from mini_ema.bot.llm_cache import make_cache_key
+
+
+def test_get_and_set():
+    """Test storing and retrieving values."""
+    cache = LLMCache()
+    assert cache.get("key") is None
+
+    cache.set("key", {"content": "hello"})
+    assert cache.get("key") == {"content": "hello"}
+    assert len(cache) == 1
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted when full."""
+    cache = LLMCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # Touch "a" so that "b" becomes the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_expiry():
+    """Test that entries expire after the TTL."""
+    cache = LLMCache(ttl=0.01)
+    cache.set("key", 1)
+    assert cache.get("key") == 1
+
+    time.sleep(0.02)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_clear():
+    """Test clearing the cache."""
+    cache = LLMCache()
+    cache.set("key", 1)
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.get("key") is None
+
+
+def test_make_cache_key():
+    """Test that cache keys are stable and sensitive to every part."""
+    key = make_cache_key(model="m", history=[{"role": "user"}], message="hi")
+
+    assert key == make_cache_key(message="hi", history=[{"role": "user"}], model="m")
+    assert key != make_cache_key(model="m", history=[], message="hi")
+    assert key != make_cache_key(model="m", history=[{"role": "user"}], message="hello")
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_get_and_set()
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_clear()
+    test_make_cache_key()
+    print("All tests passed!")
@@ -0,0 +1,238 @@
+"""Unit tests for PrettyGeminiBot response handling."""
+
+import asyncio
+from types import SimpleNamespace
+from typing import get_args
+
+from google.genai import types
+
+from mini_ema.bot import LLMCache, PrettyGeminiBot, SemanticCache
+from mini_ema.bot.pretty_gemini_bot import EMA_MESSAGE_SCHEMA, EmaMessage, _parse_partial_fields
+
+
+# Structured answer streamed in small pieces, as Gemini sends partial JSON
+ANSWER_JSON = '{"think": "A greeting.", "expression": "smile", "action": "wave", "speak": "Hi!"}'
+ANSWER_PIECES = ['{"think": "A gre', 'eting.", "expression": "smile", "act', 'ion": "wave", "speak": "H', 'i!"}']
+
+
+def _chunks():
+    """Build fake streamed response chunks for the structured answer."""
+    chunks = [SimpleNamespace(text=piece, candidates=[SimpleNamespace(finish_reason=None)]) for piece in ANSWER_PIECES]
+    chunks[-1].candidates[0].finish_reason = SimpleNamespace(value="STOP")
+    for chunk in chunks:
+        chunk.usage_metadata = None
+        chunk.model_version = "gemini-test"
+    return chunks
+
+
+class FakeModels:
+    """Models API that streams the structured answer for every request."""
+
+    def __init__(self):
+        self.requests = []
+
+    def generate_content_stream(self, model, contents, config):
+        self.requests.append(contents)
+        yield from _chunks()
+
+
+class FakeAsyncModels(FakeModels):
+    """Async models API that streams the structured answer for every request."""
+
+    async def generate_content_stream(self, model, contents, config):
+        self.requests.append(contents)
+
+        async def stream():
+            for chunk in _chunks():
+                yield chunk
+
+        return stream()
+
+
+def test_parse_partial_fields():
+    """Test extracting finished and unfinished string fields from partial JSON."""
+    fields, closed = _parse_partial_fields('{"think": "Say \\"hi\\"", "expression": "smi')
+
+    assert fields == {"think": 'Say "hi"', "expression": "smi"}
+    assert closed == {"think"}
+
+    # An escape sequence cut off at the end of the buffer is dropped
+    assert _parse_partial_fields('{"speak": "caf\\u00')[0] == {"speak": "caf"}
+
+
+def test_ema_message_schema():
+    """Test that the precomputed schema keeps the field order and allowed values of EmaMessage."""
+    assert EMA_MESSAGE_SCHEMA.property_ordering == ["think", "expression", "action", "speak"]
+    assert EMA_MESSAGE_SCHEMA.required == ["think", "expression", "action", "speak"]
+    assert EMA_MESSAGE_SCHEMA.properties["expression"].enum == list(
+        get_args(EmaMessage.model_fields["expression"].annotation)
+    )
+    assert EMA_MESSAGE_SCHEMA.properties["speak"].type == types.Type.STRING
+
+
+def test_format_message_omits_empty_sections():
+    """Test that neutral indicators and empty fields are left out of the formatted message."""
+    bot = PrettyGeminiBot(api_key="test-key")
+
+    assert bot._format_message(EmaMessage(think="", expression="neutral", action="nod", speak="Yes.")) == (
+        "[Action: nod]\n\nYes."
+    )
+    assert bot._format_message(EmaMessage(think="Hmm.", expression="sad", action="none", speak="")) == (
+        "*(Hmm.)*\n\n[Expression: sad]"
+    )
+
+
+def test_get_response_streams_partial_messages():
+    """Test that the structured answer is streamed as growing pending messages."""
+    bot = PrettyGeminiBot(api_key="test-key")
+    bot.stream_flush_interval = 0
+    bot.client = SimpleNamespace(models=FakeModels())
+
+    messages = list(bot.get_response("hello"))
+
+    final = "*(A greeting.)*\n\n[Expression: smile] [Action: wave]\n\nHi!"
+    assert [m["content"] for m in messages] == [
+        "*(A gre",
+        "*(A greeting.)*\n\n[Expression: smile]",
+        "*(A greeting.)*\n\n[Expression: smile] [Action: wave]\n\nH",
+        final,
+        final,
+    ]
+    assert all(m["pending"] for m in messages[:-1])
+    assert "pending" not in messages[-1]
+    assert "status" not in messages[-1]["metadata"]
+    assert messages[-1]["metadata"]["log"] == "Model: gemini-test | Finish: Stop"
+
+
+def test_get_response_uses_response_cache():
+    """Test that a repeated request is answered from the response cache and still recorded."""
+    models = FakeModels()
+    bot = PrettyGeminiBot(api_key="test-key", response_cache=LLMCache())
+    bot.client = SimpleNamespace(models=models)
+
+    first = list(bot.get_response("hello", "Phoenix"))
+    bot.clear()
+    second = list(bot.get_response("hello", "Phoenix"))
+
+    assert len(models.requests) == 1
+    assert second[0]["content"] == first[-1]["content"]
+    assert second[0]["metadata"]["log"] == "Response cache hit"
+    assert "status" not in second[0]["metadata"]
+    assert len(bot.conversation_history.get_recent_messages()) == 2
+
+    # A different user is a different request
+    list(bot.get_response("hello", "Sherry"))
+    assert len(models.requests) == 2
+
+
+def test_get_response_uses_semantic_cache():
+    """Test that a near-duplicate message is answered from the semantic cache."""
+    embeddings = {"hello": [1.0, 0.0], "hello!": [0.99, 0.05]}
+    models = FakeModels()
+    models.embed_content = lambda model, contents: SimpleNamespace(
+        embeddings=[SimpleNamespace(values=embeddings[contents])]
+    )
+    bot = PrettyGeminiBot(api_key="test-key", semantic_cache=SemanticCache(threshold=0.9))
+    bot.client = SimpleNamespace(models=models)
+
+    first = list(bot.get_response("hello"))
+    second = list(bot.get_response("hello!"))
+
+    assert len(models.requests) == 1
+    assert second[0]["content"] == first[-1]["content"]
+    assert second[0]["metadata"]["log"].startswith("Semantic cache hit")
+
+    # The new user message is recorded with the cached answer
+    history = bot.conversation_history.get_recent_messages()
+    assert len(history) == 4
+    assert "hello!" in history[2].parts[0].text
+    assert history[3] is history[1]
+
+
+def test_aget_response_uses_async_client():
+    """Test that the async path answers through the aio client and records the turn."""
+    bot = PrettyGeminiBot(api_key="test-key")
+    bot.client = SimpleNamespace(aio=SimpleNamespace(models=FakeAsyncModels()))
+
+    async def collect():
+        return [msg async for msg in bot.aget_response("hello", "Phoenix")]
+
+    messages = asyncio.run(collect())
+
+    assert messages[-1]["content"] == "*(A greeting.)*\n\n[Expression: smile] [Action: wave]\n\nHi!"
+    assert messages[-1]["metadata"]["log"] == "Model: gemini-test | Finish: Stop"
+    history = bot.conversation_history.get_recent_messages()
+    assert history[0].parts[0].text == "<username>Phoenix</username>\n<user_message>hello</user_message>"
+    assert history[1].parts[0].text == ANSWER_JSON
+
+
+def test_aget_response_reports_errors():
+    """Test that an exception on the async path is turned into an error message."""
+    bot = PrettyGeminiBot(api_key="test-key")
+    bot.client = None
+
+    async def collect():
+        return [msg async for msg in bot.aget_response("hello")]
+
+    messages = asyncio.run(collect())
+
+    assert len(messages) == 1
+    assert messages[0]["metadata"]["title"] == "❌ Error"
+
+
+def test_aget_responses_uses_structured_output():
+    """Test that one-shot answers use the character config and are formatted like chat answers."""
+    requests = []
+
+    async def generate_content(model, contents, config):
+        requests.append((contents, config))
+        return SimpleNamespace(
+            text=ANSWER_JSON,
+            candidates=[SimpleNamespace(finish_reason=SimpleNamespace(value="STOP"))],
+            usage_metadata=None,
+            model_version="gemini-test",
+        )
+
+    bot = PrettyGeminiBot(api_key="test-key")
+    bot.client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+
+    results = asyncio.run(bot.aget_responses(["hello"], "Phoenix"))
+
+    assert results[0]["content"] == "*(A greeting.)*\n\n[Expression: smile] [Action: wave]\n\nHi!"
+    contents, config = requests[0]
+    assert contents == "<username>Phoenix</username>\n<user_message>hello</user_message>"
+    assert config.response_schema is EMA_MESSAGE_SCHEMA
+    assert config.thinking_config.thinking_level == bot.thinking_level
+    assert bot.conversation_history.get_recent_messages() == []
+
+
+def test_get_response_sends_history_and_records_one_round():
+    """Test that each request carries the recent history and adds exactly one round to it."""
+    models = FakeModels()
+    bot = PrettyGeminiBot(api_key="test-key")
+    bot.client = SimpleNamespace(models=models)
+
+    list(bot.get_response("hello"))
+    list(bot.get_response("again"))
+
+    # The whole streamed answer is recorded as a single model content after the user message
+    history = bot.conversation_history.get_recent_messages()
+    assert [content.role for content in history] == ["user", "model", "user", "model"]
+    assert history[1].parts[0].text == ANSWER_JSON
+    assert models.requests[1][:2] == history[:2]
+    assert models.requests[1][2] is history[2]
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_parse_partial_fields()
+    test_ema_message_schema()
+    test_format_message_omits_empty_sections()
+    test_get_response_streams_partial_messages()
+    test_get_response_uses_response_cache()
+    test_get_response_uses_semantic_cache()
+    test_aget_response_uses_async_client()
+    test_aget_response_reports_errors()
+    test_aget_responses_uses_structured_output()
+    test_get_response_sends_history_and_records_one_round()
+    print("All tests passed!")
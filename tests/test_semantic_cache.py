@@ -0,0 +1,78 @@
+"""Unit tests for SemanticCache class."""
+
+from mini_ema.bot import SemanticCache
+
+
+def test_exact_hit():
+    """Test that an identical embedding returns the stored value."""
+    cache = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0, 0.0], "hello")
+
+    value, similarity = cache.get([1.0, 0.0, 0.0])
+    assert value == "hello"
+    assert similarity > 0.99
+
+
+def test_similar_hit_and_miss():
+    """Test that similarity is compared against the threshold."""
+    cache = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0], "hello")
+
+    # Scaled and slightly rotated vectors are still similar
+    assert cache.get([2.0, 0.1])[0] == "hello"
+    # Orthogonal vectors are not
+    assert cache.get([0.0, 1.0]) is None
+
+
+def test_empty_cache():
+    """Test lookups on an empty cache."""
+    cache = SemanticCache()
+    assert cache.get([1.0, 0.0]) is None
+    assert len(cache) == 0
+
+
+def test_returns_most_similar():
+    """Test that the most similar stored entry wins."""
+    cache = SemanticCache(threshold=0.5)
+    cache.add([1.0, 0.0], "x")
+    cache.add([0.0, 1.0], "y")
+
+    assert cache.get([0.2, 1.0])[0] == "y"
+    assert cache.get([1.0, 0.2])[0] == "x"
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted when full."""
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.add([1.0, 0.0, 0.0], "a")
+    cache.add([0.0, 1.0, 0.0], "b")
+
+    # Touch "a" so that "b" becomes the least recently used entry
+    assert cache.get([1.0, 0.0, 0.0])[0] == "a"
+    cache.add([0.0, 0.0, 1.0], "c")
+
+    assert len(cache) == 2
+    assert cache.get([1.0, 0.0, 0.0])[0] == "a"
+    assert cache.get([0.0, 1.0, 0.0]) is None
+    assert cache.get([0.0, 0.0, 1.0])[0] == "c"
+
+
+def test_clear():
+    """Test clearing the cache."""
+    cache = SemanticCache()
+    cache.add([1.0, 0.0], "hello")
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.get([1.0, 0.0]) is None
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_exact_hit()
+    test_similar_hit_and_miss()
+    test_empty_cache()
+    test_returns_most_similar()
+    test_lru_eviction()
+    test_clear()
+    print("All tests passed!")